@@ -1,8 +1,12 @@
 from flask import Flask
-from .routes import main  # Ensure this import is correct
+from .routes import main, puzzles, puzzle_pool  # Ensure this import is correct
 
-def create_app():
+def create_app(prewarm=False, pregenerate=False):
     app = Flask(__name__)
     app.config['SECRET_KEY'] = 'your_secret_key'
     app.register_blueprint(main)  # Make sure the Blueprint is registered
+    if prewarm:
+        puzzles.prewarm()  # Open the puzzle bank now instead of on the first puzzle request
+    if pregenerate:
+        puzzle_pool.start()  # Keep queues of freshly generated puzzles topped up in the background
     return app
\ No newline at end of file
@@ -1,23 +1,57 @@
-import copy, random
+import copy, math, random
+try:
+    from .candidate_masks import CandidateMasks
+    from .dlx_solver import DLXSolver
+    from .propagation import Propagator, TECHNIQUES
+    from .search_stats import SearchBudget, SearchStats
+    from .peer_tables import SIZES, peer_tables
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from candidate_masks import CandidateMasks
+    from dlx_solver import DLXSolver
+    from propagation import Propagator, TECHNIQUES
+    from search_stats import SearchBudget, SearchStats
+    from peer_tables import SIZES, peer_tables
+
+BACKENDS = ('bitmask', 'sets', 'dlx')
+
+
 class UnifiedSolver:
-    def __init__(self, board, difficulty='auto'): #takes the difficulty level assigned to the sudoku board generated
+    def __init__(self, board, difficulty='auto', backend='bitmask', propagate=True, stats=None): #takes the difficulty level assigned to the sudoku board generated
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown solver backend: {backend}")
         self.board = board #expects a 2D list that represents a sudoku grid 
+        self.size = len(board) #9 for a standard board, 16 or 25 for the larger ones
+        self.box = math.isqrt(self.size) #side of the inner boxes, 3 on a 9x9 board
+        self.tables = peer_tables(self.size) if self.size in SIZES else None #shared peer/unit tables, None for a malformed board (see validate_board)
         self.difficulty = difficulty
-        self.possible_values = [[set(range(1, 10)) if cell == 0 else set() for cell in row] for row in board] #Create al list with all possible values in empty cells.
+        self.backend = backend #'bitmask' keeps candidates as bit words with an undo trail, 'sets' is the original set-of-sets search, 'dlx' is exact cover with Dancing Links
+        if propagate is True: #logical deductions run to a fixpoint at every node of the bitmask search. False turns them off, a tuple picks techniques.
+            propagate = TECHNIQUES
+        self.propagator = Propagator(propagate) if propagate else None
+        if stats is True:
+            stats = SearchStats()
+        self.stats = stats #a SearchStats (or True for a new one) records nodes, backtracks, depth, eliminations and time of every solve. None runs the untraced searches.
+        self.possible_values = [[set(range(1, self.size + 1)) if cell == 0 else set() for cell in row] for row in board] #Create al list with all possible values in empty cells.
         if difficulty == 'hard': #this part of the code is for the advance_solver. Compute all possible values per cell, and then uses the constrained function to select those cells with the least amount of possible values. 
             self.compute_possible_values()
 
-    def validate_board(self, board): #function to validate a correct board of 9x9 size.
-        if len(board) != 9 or any(len(row) != 9 for row in board):
-            return False
-        if any(not (0 <= cell <= 9) for row in board for cell in row):
+    @staticmethod
+    def validate_board(board): #function to validate a correct board of 9x9 size (or 4x4, 16x16, 25x25). Safe on any decoded JSON, so it can run before a solver is built.
+        if not isinstance(board, list) or len(board) not in SIZES:
             return False
+        size = len(board)
+        for row in board:
+            if not isinstance(row, list) or len(row) != size:
+                return False
+            for cell in row:
+                if type(cell) is not int or not 0 <= cell <= size: #bool and float cells are refused too
+                    return False
         return True
 
 
     def compute_possible_values(self): # Computes possible numbers for each cell based on the current state of the board.
-        for i in range(9):
-            for j in range(9):
+        for i in range(self.size):
+            for j in range(self.size):
                 if self.board[i][j] != 0:
                     self.update_possible_values(i, j, self.board[i][j], True)
 
@@ -25,67 +59,183 @@ class UnifiedSolver:
         affected_cells = self.get_affected_cells(row, col)
         if not affected_cells:
             raise Exception("No affected cells found.")
+        possible_values = self.possible_values
         if is_placing: #this determines if the number is being places or not (so to update or not)
             for r, c in affected_cells:
-                self.possible_values[r][c].discard(num)
+                possible_values[r][c].discard(num)
         else:
             for r, c in affected_cells:
-                self.possible_values[r][c].add(num)   
+                possible_values[r][c].add(num)
 
     def solve(self): #to choose or decide which method we'll be using
+        if self.backend == 'dlx': #exact cover has predictable solve times whatever the difficulty
+            return self.dlx_solve()
         if self.difficulty == 'easy': #For very easy puzzles, use basic solve as it will be faster if no recursion is needed.
             return self.basic_solve()
         else:
             return self.advanced_solve()
 
     def basic_solve(self): #solve board using classic backtracking solution
-        empty = self.find_empty_location()
-        if not empty:
-            return True
-        row, col = empty
-
-        for num in range(1, 10):  #validating step to follow sudoku's rules. 
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                if self.basic_solve():
-                    return True
-                self.board[row][col] = 0
-        return False
+        if self.stats is not None:
+            return self.stats.timed(self._basic_solve_traced)
+        return self._basic_solve()
+
+    def _basic_solve(self):
+        # Backtracking without recursion: the empty cells are filled in reading order, which is the order the
+        # first-empty-cell search visits them in, so a list of them and the next digit to try per cell is the whole stack.
+        board, size = self.board, self.size
+        cells = [(row, col) for row in range(size) for col in range(size) if board[row][col] == 0]
+        next_num = [1] * len(cells)
+        k = 0
+        while k < len(cells):
+            row, col = cells[k]
+            board[row][col] = 0
+            for num in range(next_num[k], size + 1):  #validating step to follow sudoku's rules. 
+                if self.is_valid(row, col, num):
+                    board[row][col] = num
+                    next_num[k] = num + 1
+                    k += 1
+                    break
+            else: #no digit left for this cell, backtrack to the previous one
+                if k == 0:
+                    return False
+                next_num[k] = 1
+                k -= 1
+        return True
+
+    def _basic_solve_traced(self):
+        board, stats, size = self.board, self.stats, self.size
+        cells = [(row, col) for row in range(size) for col in range(size) if board[row][col] == 0]
+        next_num = [1] * len(cells)
+        k = 0
+        stats.enter(0, cells[0][0] * size + cells[0][1] if cells else -1)
+        while k < len(cells):
+            row, col = cells[k]
+            if board[row][col]:
+                board[row][col] = 0
+                stats.backtracks += 1
+            for num in range(next_num[k], size + 1):
+                if self.is_valid(row, col, num):
+                    board[row][col] = num
+                    next_num[k] = num + 1
+                    k += 1
+                    stats.enter(k, cells[k][0] * size + cells[k][1] if k < len(cells) else -1)
+                    break
+            else:
+                if k == 0:
+                    return False
+                next_num[k] = 1
+                k -= 1
+        return True
     
     def advanced_solve(self): #solves sudokus using a constrained propagation method by selecting the cells with the fewest possible values. 
-        empty = self.find_most_constrained_location()
-        if not empty:
-            return True
-        row, col = empty
-
-        for num in sorted(self.possible_values[row][col]):
-            if self.is_valid(row, col, num):
-                self.board[row][col] = num
-                original_possible_values = copy.deepcopy(self.possible_values)
-                self.update_possible_values(row, col, num, True)
-
-                if self.advanced_solve():
-                    return True
+        if self.backend == 'bitmask':
+            return self._advanced_solve_bitmask()
+        if self.backend == 'dlx':
+            return self.dlx_solve()
+        return self._advanced_solve_sets()
 
-                # Backtrack here if the number is not valid. 
-                self.board[row][col] = 0
-                self.possible_values = original_possible_values
+    def dlx_solve(self): #solves the board as an exact cover problem over the Sudoku constraints (324 on a 9x9 board)
+        if self.stats is not None:
+            solution = self.stats.timed(DLXSolver(self.board, self.stats).solve)
+        else:
+            solution = DLXSolver(self.board).solve()
+        if solution is None:
+            return False
+        for row in range(self.size):
+            self.board[row][:] = solution[row]
+        return True
 
-        return False
+    def _advanced_solve_bitmask(self): #same MRV search, but place/undo are trail operations instead of a deepcopy of all 81 sets
+        state = CandidateMasks(self.board)
+        if not state.consistent:
+            return False
+        if self.stats is not None:
+            found = self.stats.timed(state.search_traced, self.propagator, self.stats)
+        else:
+            found = state.search(self.propagator)
+        if not found:
+            return False
+        size = self.size
+        for row in range(size):
+            self.board[row][:] = state.values[row * size:row * size + size]
+        return True
+
+    def _advanced_solve_sets(self):
+        if self.stats is not None:
+            return self.stats.timed(self._advanced_solve_sets_traced)
+        return self._advanced_solve_sets_search()
+
+    def _advanced_solve_sets_search(self):
+        # Explicit stack of (row, col, digits left to try, possible values saved before the cell was filled)
+        frames = []
+        while True:
+            empty = self.find_most_constrained_location()
+            if not empty:
+                return True
+            row, col = empty
+            frames.append((row, col, iter(sorted(self.possible_values[row][col])), None))
+            while frames: #fill the top cell with its next valid digit, backtracking when it has none left
+                row, col, nums, saved = frames[-1]
+                if saved is not None:
+                    # Backtrack here if the number is not valid. 
+                    self.board[row][col] = 0
+                    self.possible_values = saved
+                for num in nums:
+                    if self.is_valid(row, col, num):
+                        self.board[row][col] = num
+                        frames[-1] = (row, col, nums, copy.deepcopy(self.possible_values))
+                        self.update_possible_values(row, col, num, True)
+                        break
+                else:
+                    frames.pop()
+                    continue
+                break
+            else:
+                return False
+
+    def _advanced_solve_sets_traced(self):
+        stats = self.stats
+        frames = []
+        while True:
+            empty = self.find_most_constrained_location()
+            stats.enter(len(frames), empty[0] * self.size + empty[1] if empty else -1)
+            if not empty:
+                return True
+            row, col = empty
+            frames.append((row, col, iter(sorted(self.possible_values[row][col])), None))
+            while frames:
+                row, col, nums, saved = frames[-1]
+                if saved is not None:
+                    self.board[row][col] = 0
+                    self.possible_values = saved
+                    frames[-1] = (row, col, nums, None)
+                    stats.backtracks += 1
+                for num in nums:
+                    if self.is_valid(row, col, num):
+                        self.board[row][col] = num
+                        frames[-1] = (row, col, nums, copy.deepcopy(self.possible_values))
+                        self.update_possible_values(row, col, num, True)
+                        break
+                else:
+                    frames.pop()
+                    continue
+                break
+            else:
+                return False
 
     def find_empty_location(self):  #Finds the first empty location identified by a 0 on the board to attempt to place a number.
-        for i in range(9):
-            for j in range(9):
+        for i in range(self.size):
+            for j in range(self.size):
                 if self.board[i][j] == 0:
                     return (i, j)
-        print("Warning: no empty location found; check if all is complete")
-        return None
+        return None #the board is full, which is how a successful search ends
 
     def find_most_constrained_location(self): #find the most constrained parts of the puzzle to make it easier to solve. 
         min_options = float('inf')
         best_spot = None
-        for i in range(9):
-            for j in range(9):
+        for i in range(self.size):
+            for j in range(self.size):
                 if self.board[i][j] == 0 and len(self.possible_values[i][j]) < min_options:
                     min_options = len(self.possible_values[i][j])
                     best_spot = (i, j)
@@ -96,69 +246,116 @@ class UnifiedSolver:
         return best_spot
 
     def is_valid(self, row, col, num): #checks the validity of the number input based on Sudoku's rules. 
-        if not ( 1 <= num <= 9):
-            raise ValueError("Attempted to place an invalid number outside the range 1-9.")
-        for x in range(9):
-            if self.board[row][x] == num or self.board[x][col] == num:
+        if not ( 1 <= num <= self.size):
+            raise ValueError(f"Attempted to place an invalid number outside the range 1-{self.size}.")
+        board = self.board
+        if board[row][col] == num:
+            return False
+        for r, c in self.tables.peer_cells[row * self.size + col]: #the row, column and inner box of the cell, without the cell itself
+            if board[r][c] == num:
                 return False
-        start_row = 3 * (row // 3) #create the three by three sub-matrix to check validity in this inner boxes
-        start_col = 3 * (col // 3)
-        for i in range(start_row, start_row + 3):
-            for j in range(start_col, start_col + 3):
-                if self.board[i][j] == num:
-                    return False
         return True
 
-    def get_affected_cells(self, row, col): # Returns a set of cells that are affected by changes in the given cell and thus only updating these affected cells possible values. 
-        affected = set()
-        for i in range(9):
-            affected.add((row, i))
-            affected.add((i, col))
-        start_row, start_col = 3 * (row // 3), 3 * (col // 3)
-        for i in range(3):
-            for j in range(3):
-                affected.add((start_row + i, start_col + j))
-        affected.discard((row, col))  # Exclude the cell itself
-        return affected
+    def get_affected_cells(self, row, col): # Returns the cells that are affected by changes in the given cell and thus only updating these affected cells possible values.
+        return self.tables.peer_cells[row * self.size + col] #shared precomputed tuple, nothing is allocated per call
     
     #additional validation tool of the entire board. Verify the validity of each solution within the submatrices
     
     def check_grid_items(self):
         list_bool = []
-        for x in range(9):
+        board, size, peer_cells = self.board, self.size, self.tables.peer_cells
+        for x in range(size):
             list_bool_row = []
-            for y in range(9):
-                if self.board[x][y] == 0:
+            for y in range(size):
+                num = board[x][y]
+                if num == 0:
                     list_bool_row.append(True)  # Consider empty cells as valid for this context
                 else:
-                    num = self.board[x][y]
-                    # Check for number's occurrence in row, column, and box
-                    is_valid = (self.board[x].count(num) == 1 and
-                                [self.board[i][y] for i in range(9)].count(num) == 1 and
-                                [self.board[i][j] for i in range(x//3*3, (x//3+1)*3)
-                                for j in range(y//3*3, (y//3+1)*3)].count(num) == 1)
-                    list_bool_row.append(is_valid)
+                    # The number must not occur again in its row, column or box
+                    list_bool_row.append(all(board[r][c] != num for r, c in peer_cells[x * size + y]))
             list_bool.append(list_bool_row)
         return list_bool
     
-    def has_single_solution(self, attempts=50): #check if the puzzle has a single solution, default is 50 attempts as this was found to have 100% accuracy rate for our test set of sudokus without unique solutions. 
-        initial_board = copy.deepcopy(self.board)
-        self.compute_possible_values()
-        self.advanced_solve()
-        first_solution = copy.deepcopy(self.board)
-
-        for _ in range(attempts):
-            # Reset the board for the next attempt
-            self.board = [[cell for cell in row] for row in initial_board]
-            self.possible_values = [[set(range(1, 10)) if cell == 0 else set() for cell in row] for row in self.board]
-            
-            self.compute_possible_values()
-            self.advanced_solve()
-            current_solution = copy.deepcopy(self.board)
+    def count_solutions(self, limit=2): #counts solutions of the current board exactly, stopping once limit is reached. The board itself is left untouched.
+        if self.backend == 'dlx':
+            if self.stats is not None:
+                return self.stats.timed(DLXSolver(self.board, self.stats).count_solutions, limit)
+            return DLXSolver(self.board).count_solutions(limit)
+        state = CandidateMasks(self.board)
+        if not state.consistent:
+            return 0
+        if self.stats is not None:
+            return self.stats.timed(state.count_solutions_traced, limit, self.propagator, self.stats)
+        return state.count_solutions(limit, self.propagator)
 
-            if current_solution != first_solution:
-                return False
+    def has_other_solution(self, solution, cells): #True if the board has a solution that differs from solution in one of cells
+        # Used when carving a puzzle with a known solution: if the board was unique before cells were emptied, any
+        # other solution must change one of them, so one small search per cell replaces a full uniqueness check.
+        state = CandidateMasks(self.board)
+        if not state.consistent:
+            return False
+        for row, col in cells:
+            mark = state.mark()
+            if state.eliminate(row * self.size + col, 1 << (solution[row][col] - 1)):
+                if self.stats is not None:
+                    found = self.stats.timed(state.search_traced, self.propagator, self.stats)
+                else:
+                    found = state.search(self.propagator)
+                if found:
+                    return True
+            state.undo(mark)
+        return False
 
-        return True
+    def solve_with_budget(self, max_nodes=None, max_seconds=None, cancel=None):
+        """
+        Solves the board like solve(), but gives up once a limit is reached. Meant for boards sent by clients.
+
+        Parameters:
+        max_nodes (int): search nodes allowed, None for no limit
+        max_seconds (float): wall time allowed, None for no limit
+        cancel (CancelToken): stops the search once cancelled, e.g. from the thread that is waiting for it
+
+        Returns:
+        dict: 'status' is 'solved', 'unsolvable', 'invalid' (not a well-formed board) or 'budget_exceeded', with
+            'reason' ('nodes', 'time' or 'cancelled' for an exceeded budget, None otherwise), 'solution' (the board
+            when solved), and the 'nodes' and 'seconds' spent. The board is left as it was unless it was solved.
+        """
+        result = {'status': 'invalid', 'reason': None, 'solution': None, 'nodes': 0, 'seconds': 0.0}
+        if not self.validate_board(self.board):
+            return result
+        # The sets search copies every cell's candidate set at each node, milliseconds a node on large boards, so
+        # it looks at the clock every node. The other searches take microseconds a node and keep the default.
+        heavy = self.backend == 'sets' and self.difficulty != 'easy'
+        budget = SearchBudget(max_nodes, max_seconds, cancel, check_every=1 if heavy else None)
+        saved, stats = [row[:] for row in self.board], self.stats
+        saved_values = copy.deepcopy(self.possible_values) if self.backend == 'sets' else None
+        self.stats = budget #the budgeted search is the traced one, this solver's own stats do not record it
+        try:
+            solved = self.solve()
+        finally:
+            self.stats = stats
+        if budget.exceeded is not None:
+            for row in range(self.size):
+                self.board[row][:] = saved[row] #the basic and sets searches fill the board in place
+            if saved_values is not None:
+                self.possible_values = saved_values
+            result.update(status='budget_exceeded', reason=budget.exceeded)
+        elif solved:
+            result.update(status='solved', solution=self.board)
+        else:
+            result['status'] = 'unsolvable'
+        result.update(nodes=budget.nodes, seconds=budget.seconds)
+        return result
+
+    def search_stats(self): #what the recorded solves cost so far, as a dict. Empty when the solver was built without stats.
+        if self.stats is None:
+            return {}
+        return self.stats.as_dict()
 
+    def propagation_hits(self): #per-technique counts of the deductions made by this solver's propagation so far
+        if self.propagator is None:
+            return {}
+        return dict(self.propagator.hits)
 
+    def has_single_solution(self, attempts=None): #deterministic uniqueness check, one search that stops at the second solution. attempts is kept for older callers and ignored.
+        return self.count_solutions(limit=2) == 1
@@ -0,0 +1,257 @@
+# Resumable, streaming puzzle-bank build: full boards are generated, carved into puzzles and verified, and the
+# rows are written in fixed-size chunk CSVs (the columns of sudoku_results.csv) over a pool of worker processes.
+#
+#   python bank_builder.py <out dir> --count 10000000 --chunk-size 10000 --workers 8
+#   python bank_builder.py <out dir> --merge puzzles.csv     # once the build is complete, for puzzle_bank.convert_csv
+#   python bank_builder.py <out dir> --merge puzzles.csv --dedup bank.idx   # leaving out puzzles already in the index
+#   python bank_builder.py <out dir> --count 10000000 --dedup bank.idx       # not even generating those
+#
+# Each chunk is one task: the worker streams its rows into a temporary file and renames it into place when the
+# chunk is complete, so a chunk file on disk is always whole. build.json records the build settings and progress
+# after every finished chunk. Running the same command again skips the chunks already on disk, and every chunk is
+# generated from its own seed, so an interrupted build resumes where it stopped and gives the same puzzles.
+# Only the chunks in flight are held in memory, never the whole bank.
+#
+# Duplicates (puzzles equivalent under the Sudoku symmetries, see puzzle_dedup) are dropped as they are generated:
+# a worker replaces a puzzle already in its chunk, or in the existing bank's index, with a new one, so every chunk
+# still holds its full count. Two chunks can only be compared once both exist, so duplicates across chunks of the
+# same build are dropped at merge time, which reports how many went and how far the bank is below its count.
+import csv
+import json
+import os
+import random
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .sudoku_game_v5 import SudokuGame
+    from .Solver_experiment_unified import UnifiedSolver
+    from .puzzle_dedup import DedupIndex, fingerprint
+    from .solution_cache import SolutionCache
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from sudoku_game_v5 import SudokuGame
+    from Solver_experiment_unified import UnifiedSolver
+    from puzzle_dedup import DedupIndex, fingerprint
+    from solution_cache import SolutionCache
+
+FIELDS = ('sudoku_generated', 'sudoku_solved', 'difficulty_level') #the columns of sudoku_results.csv
+CHUNK_FIELDS = FIELDS + ('fingerprint',)
+STATE_FILE = 'build.json'
+SETTINGS = ('count', 'chunk_size', 'difficulties', 'board_size', 'seed', 'dedup')
+
+
+def chunk_path(out_dir, chunk):
+    return os.path.join(out_dir, f"chunk_{chunk:06d}.csv")
+
+
+def _grid_text(board): #the '2 4 . 3 ...' text of sudoku_results.csv
+    return ' '.join(str(cell) if cell else '.' for row in board for cell in row)
+
+
+# Pipeline stages. Each one is a generator over the previous one, so a chunk is produced one puzzle at a time.
+
+def carved_puzzles(difficulties, board_size=9): #endless (difficulty, puzzle, full board), cycling through the levels
+    while True:
+        for difficulty in difficulties:
+            game = SudokuGame(board_size, difficulty) #generates a full board, then carves it keeping the solution unique
+            puzzle = [row[:] for row in game.generate_game()]
+            yield difficulty, puzzle, game.full_board
+
+
+def verified_rows(puzzles, cache=None): #CSV rows of the puzzles an independent solve confirms as unique, others are dropped
+    # cache only ever holds puzzles confirmed unique, so a puzzle equivalent to one of them needs no search
+    for difficulty, puzzle, full_board in puzzles:
+        solution = cache.get(puzzle) if cache is not None else None
+        if solution is None:
+            solver = UnifiedSolver([row[:] for row in puzzle])
+            if solver.count_solutions(limit=2) == 1 and solver.solve():
+                solution = solver.board
+                if cache is not None:
+                    cache.put(puzzle, solution)
+        if solution == full_board:
+            yield {'sudoku_generated': _grid_text(puzzle), 'sudoku_solved': _grid_text(full_board),
+                   'difficulty_level': difficulty, 'fingerprint': fingerprint(puzzle)}
+
+
+def build_chunk(out_dir, chunk, rows, difficulties, board_size, seed, dedup=None):
+    """
+    Writes one chunk file of the build. Runs in a worker process.
+
+    Puzzles equivalent to one already in the chunk, or in the DedupIndex at the path dedup, are skipped and
+    replaced by newly generated ones.
+
+    Returns:
+    tuple: (chunk, rows written, duplicates skipped, seconds)
+    """
+    start = time.perf_counter()
+    random.seed(f"{seed}:{chunk}") #the generator and carving use the random module, one stream per chunk
+    path = chunk_path(out_dir, chunk)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    index = DedupIndex(dedup, readonly=True) if dedup else None
+    seen = set()
+    written = skipped = 0
+    try:
+        with open(tmp_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, CHUNK_FIELDS)
+            writer.writeheader()
+            for row in verified_rows(carved_puzzles(difficulties, board_size), SolutionCache(rows)):
+                key = row['fingerprint']
+                if key in seen or (index is not None and index.contains_key(key)):
+                    skipped += 1
+                    continue
+                seen.add(key)
+                writer.writerow(row)
+                written += 1
+                if written == rows:
+                    break
+    finally:
+        if index is not None:
+            index.close()
+    os.replace(tmp_path, path)
+    return chunk, written, skipped, time.perf_counter() - start
+
+
+def _load_state(out_dir, settings):
+    path = os.path.join(out_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as file:
+        state = json.load(file)
+    if {key: state.get(key) for key in SETTINGS} != settings: #builds from before the dedup setting have none
+        raise ValueError(f"{out_dir} holds a build with other settings: "
+                         f"{ {key: state.get(key) for key in SETTINGS} }, asked for {settings}")
+    state.setdefault('skipped', 0)
+    return state
+
+
+def _save_state(out_dir, state):
+    path = os.path.join(out_dir, STATE_FILE)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w') as file:
+        json.dump(state, file, indent=1)
+    os.replace(tmp_path, path)
+
+
+def build(out_dir, count, chunk_size=10000, difficulties=('easy', 'medium', 'hard'), board_size=9, seed=0,
+          workers=None, progress=None, dedup=None):
+    """
+    Builds (or resumes) a bank of count puzzles as chunk CSVs in out_dir
+
+    Parameters:
+    out_dir (str): directory for the chunk files and build.json, created if needed
+    count (int): total number of puzzles
+    chunk_size (int): puzzles per chunk file, the unit of work and of resumption
+    difficulties (tuple): levels cycled through within every chunk
+    board_size (int): 9, or any size SudokuGame supports
+    seed (int): base seed, chunk k is generated from (seed, k)
+    workers (int): number of worker processes, defaults to the CPU count. 1 builds inline without a pool.
+    progress (callable): called with the state dict after every finished chunk
+    dedup (str): path of the DedupIndex of the existing bank, puzzles already in it are not generated again. An
+        empty index is created there when there is none yet.
+
+    Returns:
+    dict: the final state (settings, chunks and puzzles done, duplicates skipped, seconds spent over all runs)
+    """
+    settings = {'count': count, 'chunk_size': chunk_size, 'difficulties': list(difficulties),
+                'board_size': board_size, 'seed': seed, 'dedup': dedup}
+    os.makedirs(out_dir, exist_ok=True)
+    state = _load_state(out_dir, settings) or dict(settings, chunks=-(-count // chunk_size), done=[], skipped=0,
+                                                   seconds=0.0)
+    done = set(state['done'])
+    todo = [chunk for chunk in range(state['chunks'])
+            if chunk not in done or not os.path.exists(chunk_path(out_dir, chunk))]
+
+    def finish(result):
+        chunk, _, skipped, seconds = result
+        done.add(chunk)
+        state['done'] = sorted(done)
+        state['skipped'] += skipped
+        state['seconds'] += seconds
+        _save_state(out_dir, state)
+        if progress is not None:
+            progress(state)
+
+    tasks = ((out_dir, chunk, min(chunk_size, count - chunk * chunk_size), tuple(difficulties), board_size, seed,
+              dedup) for chunk in todo)
+    workers = workers or os.cpu_count() or 1
+    if dedup and not os.path.exists(dedup): #a first build against a new index, which merge --dedup fills later
+        DedupIndex(dedup).close()
+    _save_state(out_dir, state)
+    if workers == 1:
+        for task in tasks:
+            finish(build_chunk(*task))
+        return state
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque() #two chunks per worker in flight, so the task list is never expanded in memory
+        for task in tasks:
+            pending.append(pool.submit(build_chunk, *task))
+            if len(pending) >= 2 * workers:
+                finish(pending.popleft().result())
+        while pending:
+            finish(pending.popleft().result())
+    return state
+
+
+def merge(out_dir, csv_path, index=None):
+    """
+    Concatenates the chunks of a complete build into one CSV with the columns of sudoku_results.csv, streaming row
+    by row. With a puzzle_dedup.DedupIndex, puzzles equivalent to one already in the index (or earlier in the
+    build) are left out and the others are added to it.
+
+    Returns:
+    dict: number of puzzles kept (written) and dropped as duplicates, and 'missing', how many short of the
+        build's count the CSV is
+    """
+    with open(os.path.join(out_dir, STATE_FILE)) as file:
+        state = json.load(file)
+    if len(state['done']) != state['chunks']:
+        raise ValueError(f"The build in {out_dir} is not complete: {len(state['done'])} of {state['chunks']} chunks")
+    total = dropped = 0
+    with open(csv_path, 'w', newline='') as out:
+        writer = csv.DictWriter(out, FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for chunk in range(state['chunks']):
+            with open(chunk_path(out_dir, chunk), newline='') as file:
+                for row in csv.DictReader(file):
+                    if index is not None and not index.add_key(int(row['fingerprint'])):
+                        dropped += 1
+                        continue
+                    writer.writerow(row)
+                    total += 1
+    return {'kept': total, 'dropped': dropped, 'missing': max(0, state['count'] - total)}
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description="Builds a puzzle bank in resumable chunk files.")
+    parser.add_argument('out_dir')
+    parser.add_argument('--count', type=int, default=60)
+    parser.add_argument('--chunk-size', type=int, default=10000)
+    parser.add_argument('--difficulties', nargs='+', default=['easy', 'medium', 'hard'])
+    parser.add_argument('--size', type=int, default=9)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--merge', metavar='CSV', help="write the chunks of a finished build to one CSV instead")
+    parser.add_argument('--dedup', metavar='INDEX', help="skip puzzles already in this dedup index (and add the "
+                                                         "merged ones to it with --merge)")
+    args = parser.parse_args()
+    if args.merge:
+        index = DedupIndex(args.dedup) if args.dedup else None
+        try:
+            result = merge(args.out_dir, args.merge, index)
+            print(f"Wrote {result['kept']} puzzles to {args.merge}, dropped {result['dropped']} duplicates")
+            if result['missing']:
+                print(f"Warning: {result['missing']} puzzles short of the build's count, build more with a larger "
+                      f"--count and merge again", file=sys.stderr)
+        finally:
+            if index is not None:
+                index.close()
+    else:
+        def report(state):
+            rate = min(len(state['done']) * args.chunk_size, args.count) / state['seconds'] if state['seconds'] else 0.0
+            print(f"{len(state['done'])}/{state['chunks']} chunks, {rate:.1f} puzzles per worker-second, "
+                  f"{state['skipped']} duplicates skipped", flush=True)
+        build(args.out_dir, args.count, args.chunk_size, tuple(args.difficulties), args.size, args.seed,
+              args.workers, report, args.dedup)
@@ -0,0 +1,124 @@
+# Solves many boards at once over a process pool (e.g. re-validating the whole of sudoku_results.csv).
+# Results are streamed back in input order as dicts: {'index', 'status', 'solution', 'seconds'}
+# where status is 'solved', 'unsolvable', 'invalid', 'timeout', 'budget_exceeded' (too many search nodes) or 'error'.
+import csv
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .Solver_experiment_unified import UnifiedSolver
+    from .peer_tables import parse_grid
+    from .solution_cache import SolutionCache
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from Solver_experiment_unified import UnifiedSolver
+    from peer_tables import parse_grid
+    from solution_cache import SolutionCache
+
+
+def solve_one(index, board, backend, timeout, max_nodes=None, cache=None): #solves one board into a result dict, errors and exceeded budgets come back as its status
+    # The limits are checked by the search itself at its nodes (see UnifiedSolver.solve_with_budget), so they hold
+    # in any thread, not only in the main thread of a worker. Without limits the untraced search runs.
+    # With a SolutionCache, a board equivalent to one solved before is a lookup, and new solutions are added to it.
+    start = time.perf_counter()
+    solution = None
+    try:
+        solver = UnifiedSolver([list(row) for row in board], backend=backend)
+        if not solver.validate_board(solver.board):
+            status = 'invalid'
+        else:
+            solution = cache.get(solver.board) if cache is not None else None
+            if solution is not None:
+                status = 'solved'
+            else:
+                if backend == 'sets':
+                    solver.compute_possible_values() #what difficulty='hard' does, once the board shape is known to be safe
+                if timeout or max_nodes:
+                    result = solver.solve_with_budget(max_nodes, timeout or None)
+                    status = 'timeout' if result['reason'] == 'time' else result['status']
+                else:
+                    status = 'solved' if solver.solve() else 'unsolvable'
+                if status == 'solved':
+                    solution = solver.board
+                    if cache is not None:
+                        cache.put(board, solution)
+    except Exception: #a malformed board must not take the whole batch down
+        status = 'error'
+    return {'index': index, 'status': status, 'solution': solution, 'seconds': time.perf_counter() - start}
+
+
+_worker_cache = None #the SolutionCache of a pool worker process, kept across the chunks it solves
+
+
+def _start_worker(cache_size):
+    global _worker_cache
+    _worker_cache = SolutionCache(cache_size) if cache_size else None
+
+
+def _solve_chunk(chunk, backend, timeout, max_nodes, cache=None):
+    cache = _worker_cache if cache is None else cache
+    return [solve_one(index, board, backend, timeout, max_nodes, cache) for index, board in chunk]
+
+
+def _chunks(boards, chunksize):
+    chunk = []
+    for item in enumerate(boards):
+        chunk.append(item)
+        if len(chunk) == chunksize:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def solve_many(boards, workers=None, chunksize=16, timeout=None, backend='bitmask', max_nodes=None, cache_size=0):
+    """
+    Solves an iterable of boards (9x9, or any size UnifiedSolver takes), yielding one result dict per board in input order
+
+    Parameters:
+    boards (iterable): 2D lists of ints, 0 marking an empty cell. Consumed lazily.
+    workers (int): number of worker processes, defaults to the CPU count. 1 solves inline without a pool.
+    chunksize (int): boards sent to a worker per task
+    timeout (float): seconds allowed per board before it is reported as 'timeout'
+    backend (str): UnifiedSolver backend used for every board
+    max_nodes (int): search nodes allowed per board before it is reported as 'budget_exceeded'
+    cache_size (int): solutions each worker remembers (see solution_cache), so repeated or equivalent boards are
+        lookups. 0 solves every board.
+    """
+    workers = workers or os.cpu_count() or 1
+    chunks = _chunks(boards, max(1, chunksize))
+    if workers == 1:
+        cache = SolutionCache(cache_size) if cache_size else None
+        for chunk in chunks:
+            yield from _solve_chunk(chunk, backend, timeout, max_nodes, cache)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker, initargs=(cache_size,)) as pool:
+        pending = deque() #keeps two chunks per worker in flight so input is read lazily and memory stays bounded
+        for chunk in chunks:
+            pending.append(pool.submit(_solve_chunk, chunk, backend, timeout, max_nodes))
+            if len(pending) >= 2 * workers:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def parse_board(text): #turns the '2 4 . 3 ...' text used in sudoku_results.csv into a 2D list (9x9, 16x16, ...)
+    return parse_grid(text)
+
+
+def boards_from_csv(path, column='sudoku_generated'): #streams the boards of a puzzle CSV without loading it all
+    with open(path, newline='') as file:
+        for record in csv.DictReader(file):
+            yield parse_board(record[column])
+
+
+if __name__ == "__main__":
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sudoku_results.csv')
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    start = time.perf_counter()
+    counts = {}
+    for result in solve_many(boards_from_csv(path), workers=workers):
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    print(f"{sum(counts.values())} boards in {time.perf_counter() - start:.2f}s: {counts}")
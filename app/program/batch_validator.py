@@ -0,0 +1,77 @@
+# Vectorised Sudoku rule checking for many boards at once, used by /validate-sudoku and for auditing the puzzle bank.
+# Boards are an (N, size, size) uint8 array with 0 for an empty cell, all boards of one array having the same size.
+import csv
+import math
+
+import numpy as np
+
+try:
+    from .peer_tables import SIZES
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from peer_tables import SIZES
+
+
+def board_array(boards): #converts a list of size x size 2D lists to an (N, size, size) uint8 array. Raises ValueError for bad shapes or values.
+    array = np.asarray(boards, dtype=np.int16)
+    if array.ndim != 3 or array.shape[1] != array.shape[2] or array.shape[1] not in SIZES:
+        raise ValueError(f"Expected boards of shape (N, size, size) with size in {SIZES}, got {array.shape}")
+    size = array.shape[1]
+    if array.size and (array.min() < 0 or array.max() > size):
+        raise ValueError(f"Board cells must be between 0 and {size}")
+    return array.astype(np.uint8)
+
+
+def conflict_masks(boards):
+    """
+    Finds the cells that break a Sudoku rule in every board at once
+
+    Parameters:
+    boards (np.ndarray): (N, size, size) uint8 array, 0 marking an empty cell
+
+    Returns:
+    np.ndarray: (N, size, size) bool array, True where the digit in a cell appears more than once
+        in its row, column or box. Empty cells are never marked.
+    """
+    n, size = boards.shape[:2]
+    box = math.isqrt(size)
+    one_hot = boards[..., None] == np.arange(1, size + 1, dtype=np.uint8) #(N, row, col, digit)
+    row_dup = one_hot.sum(axis=2, dtype=np.uint8) > 1 #(N, row, digit)
+    col_dup = one_hot.sum(axis=1, dtype=np.uint8) > 1 #(N, col, digit)
+    boxes = one_hot.reshape(n, box, box, box, box, size) #(N, band, row in band, stack, col in stack, digit)
+    box_dup = boxes.sum(axis=(2, 4), dtype=np.uint8) > 1 #(N, band, stack, digit)
+    duplicated = (row_dup[:, :, None, :] | col_dup[:, None, :, :]
+                  | box_dup[:, :, None, :, None, :].repeat(box, axis=2).repeat(box, axis=4).reshape(n, size, size, size))
+    return (one_hot & duplicated).any(axis=-1)
+
+
+def valid_boards(boards): #(N,) bool array, True for boards without any conflicting cell (empty cells allowed)
+    return ~conflict_masks(boards).reshape(boards.shape[0], -1).any(axis=1)
+
+
+def load_csv_boards(path, column='sudoku_generated'): #reads one column of a puzzle CSV into an (N, size, size) uint8 array
+    with open(path, newline='') as file:
+        texts = [record[column] for record in csv.DictReader(file)]
+    cells = ' '.join(texts).replace('.', '0').split()
+    size = math.isqrt(len(cells) // len(texts)) if texts else 9 #the CSV holds boards of a single size
+    return np.array(cells, dtype=np.uint8).reshape(len(texts), size, size)
+
+
+def audit_csv(path): #checks a whole puzzle CSV in one call. Returns the row numbers of puzzles and solutions that fail.
+    puzzles = load_csv_boards(path, 'sudoku_generated')
+    solutions = load_csv_boards(path, 'sudoku_solved')
+    bad_puzzles = ~valid_boards(puzzles)
+    bad_solutions = ~valid_boards(solutions) | (solutions == 0).any(axis=(1, 2))
+    mismatched = ((puzzles != 0) & (puzzles != solutions)).any(axis=(1, 2)) #solution does not keep the givens
+    return {
+        'boards': int(puzzles.shape[0]),
+        'invalid_puzzles': np.flatnonzero(bad_puzzles).tolist(),
+        'invalid_solutions': np.flatnonzero(bad_solutions).tolist(),
+        'mismatched_solutions': np.flatnonzero(mismatched).tolist(),
+    }
+
+
+if __name__ == "__main__":
+    import os
+    import sys
+    path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'sudoku_results.csv')
+    print(audit_csv(path))
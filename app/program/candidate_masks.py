@@ -0,0 +1,222 @@
+# Bitmask candidate state used by UnifiedSolver's default 'bitmask' backend.
+# Digit d is stored as the bit 1 << (d - 1), so the candidates of a cell fit in one word (9 bits on a 9x9 board).
+# Cells are addressed by their flat index (row * size + col, 0-80 on a 9x9 board). The index tables for the board's
+# size come from peer_tables and are shared by every state of that size.
+try:
+    from .peer_tables import peer_tables
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from peer_tables import peer_tables
+
+
+class CandidateMasks:
+    def __init__(self, board): #expects the same 2D list as UnifiedSolver (9x9, 16x16, ...), 0 marking an empty cell
+        tables = peer_tables(len(board))
+        self.tables = tables
+        self.size = size = tables.size
+        self.cells = cells = tables.cells
+        self.row_of, self.col_of, self.box_of, self.peers = tables.row_of, tables.col_of, tables.box_of, tables.peers
+        self.values = [0] * cells
+        self.candidates = [tables.all_digits] * cells #per-cell candidate word
+        self.row_used = [0] * size #digits already placed in each row/column/box
+        self.col_used = [0] * size
+        self.box_used = [0] * size
+        self.trail_cell = [0] * tables.trail_size #undo trail as parallel arrays: cell, previous candidate word, placed digit or 0
+        self.trail_word = [0] * tables.trail_size
+        self.trail_num = [0] * tables.trail_size
+        self.trail_top = 0 #number of live trail entries, undo() rolls back to a mark below it
+        self.empty_count = cells
+        self.consistent = True #False when the givens already break a Sudoku rule
+        for row in range(size):
+            for col in range(size):
+                num = board[row][col]
+                if num and not self.place(row * size + col, num):
+                    self.consistent = False
+        self.trail_top = 0 #the givens are never undone
+
+    def place(self, idx, num): #puts num in cell idx and strikes it from the peers. Returns False on a contradiction, the caller then undoes to its mark.
+        bit = 1 << (num - 1)
+        candidates = self.candidates
+        if self.values[idx] or not candidates[idx] & bit:
+            return False
+        trail_cell, trail_word = self.trail_cell, self.trail_word
+        top = self.trail_top
+        trail_cell[top] = idx
+        trail_word[top] = candidates[idx]
+        self.trail_num[top] = num
+        top += 1
+        self.values[idx] = num
+        candidates[idx] = bit
+        self.row_used[self.row_of[idx]] |= bit
+        self.col_used[self.col_of[idx]] |= bit
+        self.box_used[self.box_of[idx]] |= bit
+        self.empty_count -= 1
+        ok = True
+        trail_num = self.trail_num
+        for peer in self.peers[idx]:
+            word = candidates[peer]
+            if word & bit:
+                trail_cell[top] = peer
+                trail_word[top] = word
+                trail_num[top] = 0
+                top += 1
+                word ^= bit
+                candidates[peer] = word
+                if not word:
+                    ok = False
+        self.trail_top = top
+        return ok
+
+    def eliminate(self, idx, bits): #removes bits from an empty cell's candidates. Returns False if none are left.
+        word = self.candidates[idx]
+        if self.values[idx] or not word & bits:
+            return True
+        top = self.trail_top
+        self.trail_cell[top] = idx
+        self.trail_word[top] = word
+        self.trail_num[top] = 0
+        self.trail_top = top + 1
+        word &= ~bits
+        self.candidates[idx] = word
+        return word != 0
+
+    def mark(self): #a position in the trail that undo() can roll back to
+        return self.trail_top
+
+    def undo(self, mark): #rolls back every placement and elimination made after mark
+        trail_cell, trail_word, trail_num = self.trail_cell, self.trail_word, self.trail_num
+        candidates = self.candidates
+        top = self.trail_top
+        while top > mark:
+            top -= 1
+            idx = trail_cell[top]
+            candidates[idx] = trail_word[top]
+            num = trail_num[top]
+            if num:
+                bit = ~(1 << (num - 1))
+                self.values[idx] = 0
+                self.row_used[self.row_of[idx]] &= bit
+                self.col_used[self.col_of[idx]] &= bit
+                self.box_used[self.box_of[idx]] &= bit
+                self.empty_count += 1
+        self.trail_top = top
+
+    def most_constrained(self): #empty cell with the fewest candidates, or -1 once the board is full
+        best, best_count = -1, self.size + 1
+        values = self.values
+        candidates = self.candidates
+        bit_count = self.tables.bit_count
+        for idx in range(self.cells):
+            if not values[idx]:
+                count = bit_count[candidates[idx]]
+                if count < best_count:
+                    best, best_count = idx, count
+                    if count <= 1:
+                        break
+        return best
+
+    def search(self, propagator=None): #depth-first search over the candidate words, leaves the solution in self.values
+        return self._explore(1, propagator) == 1
+
+    def count_solutions(self, limit=2, propagator=None): #exhaustive search that stops as soon as limit solutions have been seen. The state is rolled back afterwards.
+        mark = self.trail_top
+        found = self._explore(limit, propagator)
+        self.undo(mark)
+        return found
+
+    def _explore(self, limit, propagator):
+        # Depth-first search with an explicit stack instead of recursion. Each open branch point is a frame of
+        # (cell, candidates not tried yet, trail mark), kept in arrays sized for the deepest possible search.
+        # Stops at the limit-th solution and leaves that solution in place.
+        frame_cell = [0] * (self.cells + 1)
+        frame_word = [0] * (self.cells + 1)
+        frame_mark = [0] * (self.cells + 1)
+        depth = found = 0
+        candidates = self.candidates
+        digit_of_bit = self.tables.digit_of_bit
+        while True:
+            if propagator is None or propagator.propagate(self):
+                idx = self.most_constrained()
+                if idx < 0:
+                    found += 1
+                    if found >= limit:
+                        return found
+                else:
+                    frame_cell[depth] = idx
+                    frame_word[depth] = candidates[idx]
+                    frame_mark[depth] = self.trail_top
+                    depth += 1
+            while depth: #back up to the deepest frame whose next candidate places without a contradiction
+                top = depth - 1
+                self.undo(frame_mark[top])
+                word = frame_word[top]
+                if not word:
+                    depth = top
+                    continue
+                bit = word & -word
+                frame_word[top] = word ^ bit
+                if self.place(frame_cell[top], digit_of_bit[bit]):
+                    break
+            else:
+                return found
+
+    # Same searches recording into a SearchStats. Kept apart so the untraced ones above pay nothing for it.
+
+    def search_traced(self, propagator, stats):
+        return self._explore_traced(1, propagator, stats, False) == 1
+
+    def count_solutions_traced(self, limit, propagator, stats):
+        mark = self.trail_top
+        found = self._explore_traced(limit, propagator, stats, True)
+        self.undo(mark)
+        return found
+
+    def _explore_traced(self, limit, propagator, stats, rollback): #rollback: the caller undoes the open frames at the limit, count them as backtracks
+        frame_cell = [0] * (self.cells + 1)
+        frame_word = [0] * (self.cells + 1)
+        frame_mark = [0] * (self.cells + 1)
+        depth = found = 0
+        candidates = self.candidates
+        digit_of_bit = self.tables.digit_of_bit
+        while True:
+            idx = -1
+            if propagator is None:
+                ok = True
+            else:
+                before = self.trail_top
+                ok = propagator.propagate(self)
+                stats.eliminations += self.trail_top - before
+            if ok:
+                idx = self.most_constrained()
+            stats.enter(depth, idx)
+            if ok and idx < 0:
+                found += 1
+                if found >= limit:
+                    if rollback:
+                        stats.backtracks += depth
+                    return found
+            elif ok:
+                frame_cell[depth] = idx
+                frame_word[depth] = candidates[idx]
+                frame_mark[depth] = self.trail_top
+                depth += 1
+            fresh = ok and idx >= 0 #a frame that was just opened has nothing to back out of yet
+            while depth:
+                top = depth - 1
+                self.undo(frame_mark[top])
+                if not fresh:
+                    stats.backtracks += 1
+                fresh = False
+                word = frame_word[top]
+                if not word:
+                    depth = top
+                    continue
+                bit = word & -word
+                frame_word[top] = word ^ bit
+                if self.place(frame_cell[top], digit_of_bit[bit]):
+                    break
+            else:
+                return found
+
+    def to_board(self):
+        size = self.size
+        return [self.values[row * size:row * size + size] for row in range(size)]
@@ -0,0 +1,109 @@
+# Grades puzzles by how hard they are to solve, not by how many clues they have.
+# A human-style solver applies the easiest technique that makes progress, one at a time, and the grade follows
+# the hardest technique it needed. Puzzles that logic alone cannot finish are graded by the size of the search.
+import csv
+import math
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from .candidate_masks import CandidateMasks
+    from .propagation import Propagator
+    from .search_stats import SearchStats
+    from .peer_tables import parse_grid
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from candidate_masks import CandidateMasks
+    from propagation import Propagator
+    from search_stats import SearchStats
+    from peer_tables import parse_grid
+
+# Techniques in the order a person would reach for them, with the level each one stands for.
+HUMAN_ORDER = ('hidden_single', 'naked_single', 'pointing', 'box_line', 'naked_pair')
+TECHNIQUE_LEVELS = {'hidden_single': 1, 'naked_single': 1, 'pointing': 2, 'box_line': 2, 'naked_pair': 3, 'search': 4}
+GRADES = ('easy', 'medium', 'hard', 'expert')
+HARD_SEARCH_NODES = 20 #search trees up to this size still count as 'hard', bigger ones are 'expert'
+
+
+def grade_puzzle(board):
+    """
+    Grades a puzzle (9x9, or any size CandidateMasks takes)
+
+    Returns:
+    dict: grade ('easy', 'medium', 'hard', 'expert', or 'invalid' when the puzzle does not have exactly one
+        solution), hardest_technique, nodes (search nodes, 0 when logic alone solves it), score (level of the
+        hardest technique plus log10 of the search size, for sorting) and hits per technique
+    """
+    state = CandidateMasks(board)
+    propagator = Propagator(HUMAN_ORDER)
+    nodes = 0
+    if not state.consistent or not propagator.propagate(state):
+        solutions = 0
+    elif state.empty_count == 0:
+        solutions = 1 #logic only ever removes impossible candidates, so a board it completes is unique
+    else:
+        stats = SearchStats()
+        solutions = state.count_solutions_traced(2, propagator, stats)
+        nodes = stats.nodes
+    used = [name for name in HUMAN_ORDER if propagator.hits[name]]
+    hardest = 'search' if nodes else max(used, key=TECHNIQUE_LEVELS.get, default='naked_single')
+    level = TECHNIQUE_LEVELS[hardest]
+    if solutions != 1:
+        grade = 'invalid'
+    elif hardest == 'search':
+        grade = 'hard' if nodes <= HARD_SEARCH_NODES else 'expert'
+    else:
+        grade = GRADES[level - 1]
+    return {
+        'grade': grade,
+        'hardest_technique': hardest,
+        'nodes': nodes,
+        'score': round(level + math.log10(1 + nodes), 3),
+        'hits': dict(propagator.hits),
+    }
+
+
+def is_servable(grade, max_grade='hard'): #False for invalid puzzles and for puzzles graded above max_grade
+    return grade in GRADES and GRADES.index(grade) <= GRADES.index(max_grade)
+
+
+def _grade_text(text):
+    return grade_puzzle(parse_grid(text))
+
+
+def grade_csv(in_path, out_path, workers=None, column='sudoku_generated', batch_size=1024):
+    """
+    Grades every puzzle of a CSV and writes it out with grade, hardest_technique, grade_nodes and grade_score
+    columns. Rows go through a process pool one batch at a time, in order, so memory does not grow with the bank.
+
+    Returns:
+    dict: number of puzzles per grade
+    """
+    counts = {}
+    extra = ['grade', 'hardest_technique', 'grade_nodes', 'grade_score']
+    with open(in_path, newline='') as src, open(out_path, 'w', newline='') as dst, \
+            ProcessPoolExecutor(max_workers=workers) as pool:
+        reader = csv.DictReader(src)
+        writer = csv.DictWriter(dst, fieldnames=[f for f in reader.fieldnames if f not in extra] + extra)
+        writer.writeheader()
+        batch = []
+        for row in reader:
+            batch.append(row)
+            if len(batch) == batch_size:
+                _write_graded(pool, batch, column, writer, counts)
+                batch = []
+        _write_graded(pool, batch, column, writer, counts)
+    return counts
+
+
+def _write_graded(pool, rows, column, writer, counts):
+    for row, result in zip(rows, pool.map(_grade_text, [row[column] for row in rows], chunksize=64)):
+        row.update(grade=result['grade'], hardest_technique=result['hardest_technique'],
+                   grade_nodes=result['nodes'], grade_score=result['score'])
+        writer.writerow(row)
+        counts[result['grade']] = counts.get(result['grade'], 0) + 1
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 3:
+        sys.exit("usage: python difficulty_grader.py <puzzles.csv> <graded.csv>")
+    print(grade_csv(sys.argv[1], sys.argv[2]))
@@ -0,0 +1,176 @@
+# Exact-cover solver (Knuth's Algorithm X with Dancing Links), selected with UnifiedSolver(board, backend='dlx').
+# A size x size Sudoku is written as size**3 candidate rows (cell, digit) over 4 * size**2 constraint columns. On 9x9
+# that is 729 rows over 324 columns: 0-80 cell filled, 81-161 digit in row, 162-242 digit in column, 243-323 digit in box.
+# The links are kept in flat lists indexed by node number, node 0 is the root and nodes 1 to n_columns the column headers.
+try:
+    from .peer_tables import peer_tables
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from peer_tables import peer_tables
+
+
+class DLXSolver:
+    def __init__(self, board, stats=None): #expects a 9x9 (or 16x16, ...) 2D list, 0 marking an empty cell. The board is not modified.
+        self.board = board
+        self.stats = stats #a SearchStats told about every node and backtrack of the search, None for no tracing
+        tables = peer_tables(len(board))
+        self.board_size = size = tables.size
+        cells = tables.cells
+        n_columns = 4 * cells
+        self.left = list(range(-1, n_columns)) #header links, the root sits between the last and the first column
+        self.left[0] = n_columns
+        self.right = list(range(1, n_columns + 2))
+        self.right[n_columns] = 0
+        self.up = list(range(n_columns + 1))
+        self.down = list(range(n_columns + 1))
+        self.column = list(range(n_columns + 1))
+        self.size = [0] * (n_columns + 1) #number of rows left in each column
+        self.row_id = [-1] * (n_columns + 1) #candidate (cell * size + digit - 1) each node belongs to
+        self.first_node = [0] * (cells * size) #first node of every candidate row
+        for cell in range(cells):
+            r, c, b = tables.row_of[cell], tables.col_of[cell], tables.box_of[cell]
+            for d in range(size):
+                self._add_row(cell * size + d,
+                              (cell, cells + r * size + d, 2 * cells + c * size + d, 3 * cells + b * size + d))
+        self.solution_rows = [] #candidate rows of the partial solution, givens first
+        self.solution = None #first complete solution found, as a 2D list
+        self.covered = [False] * (n_columns + 1)
+        self.consistent = True #False when the givens already break a Sudoku rule
+        for r in range(size):
+            for c in range(size):
+                num = board[r][c]
+                if num and not self._select_given((r * size + c) * size + num - 1):
+                    self.consistent = False
+
+    def _add_row(self, row_id, columns):
+        first = len(self.column)
+        self.first_node[row_id] = first
+        for k, col in enumerate(columns):
+            node = first + k
+            col += 1 #column c is header node c + 1
+            self.left.append(first + (k - 1) % 4)
+            self.right.append(first + (k + 1) % 4)
+            self.up.append(self.up[col])
+            self.down.append(col)
+            self.down[self.up[col]] = node
+            self.up[col] = node
+            self.column.append(col)
+            self.row_id.append(row_id)
+            self.size[col] += 1
+
+    def _select_given(self, row_id): #covers every column of a given's row. Fails if one of them is already taken.
+        node = self.first_node[row_id]
+        for k in range(4):
+            if self.covered[self.column[node + k]]:
+                return False
+        for k in range(4):
+            self._cover(self.column[node + k])
+        self.solution_rows.append(row_id)
+        return True
+
+    def _cover(self, col):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        self.covered[col] = True
+        right[left[col]] = right[col]
+        left[right[col]] = left[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                down[up[j]] = down[j]
+                up[down[j]] = up[j]
+                size[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def _uncover(self, col):
+        left, right, up, down, column, size = self.left, self.right, self.up, self.down, self.column, self.size
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                size[column[j]] += 1
+                down[up[j]] = j
+                up[down[j]] = j
+                j = left[j]
+            i = up[i]
+        right[left[col]] = col
+        left[right[col]] = col
+        self.covered[col] = False
+
+    def _search(self, limit): #Algorithm X, returns the number of solutions found (at most limit)
+        # Iterative: the stack holds the column branched on at each level and the row currently selected in it.
+        right, left, down, column, size = self.right, self.left, self.down, self.column, self.size
+        stats, cells = self.stats, self.board_size ** 2
+        open_cols = []
+        selected = []
+        found = 0
+        while True:
+            col = best = 0
+            if right[0] != 0:
+                best = self.board_size + 1
+                c = right[0]
+                while c != 0: #choose the column with the fewest rows left
+                    if size[c] < best:
+                        col, best = c, size[c]
+                        if best <= 1:
+                            break
+                    c = right[c]
+            if stats is not None: #a node costs dozens of link updates, one test per node is not worth a traced copy of the search
+                stats.enter(len(open_cols), col - 1 if best and col <= cells else -1) #cell columns are header nodes 1 to cells
+            if right[0] == 0:
+                if self.solution is None:
+                    self.solution = self._rows_to_board(self.solution_rows)
+                found += 1
+            elif best > 0:
+                self._cover(col)
+                r = down[col]
+                open_cols.append(col)
+                selected.append(r)
+                self._select(r)
+                continue
+            while open_cols: #take back the deepest selected row and try the next one in its column
+                col, r = open_cols[-1], selected[-1]
+                self.solution_rows.pop()
+                if stats is not None:
+                    stats.backtracks += 1
+                j = left[r]
+                while j != r:
+                    self._uncover(column[j])
+                    j = left[j]
+                r = col if found >= limit else down[r]
+                if r != col:
+                    selected[-1] = r
+                    self._select(r)
+                    break
+                self._uncover(col)
+                open_cols.pop()
+                selected.pop()
+            else:
+                return found
+
+    def _select(self, r): #adds row r to the partial solution, covering the other columns it fills
+        self.solution_rows.append(self.row_id[r])
+        right, column = self.right, self.column
+        j = right[r]
+        while j != r:
+            self._cover(column[j])
+            j = right[j]
+
+    def _rows_to_board(self, rows):
+        size = self.board_size
+        board = [[0] * size for _ in range(size)]
+        for row_id in rows:
+            cell, digit = divmod(row_id, size)
+            board[cell // size][cell % size] = digit + 1
+        return board
+
+    def solve(self): #returns the first solution as a new 2D list, or None if there is none
+        if not self.consistent:
+            return None
+        self._search(1)
+        return self.solution
+
+    def count_solutions(self, limit=2): #counts solutions exactly, stopping once limit is reached
+        if not self.consistent:
+            return 0
+        return self._search(limit)
@@ -0,0 +1,217 @@
+# Server-side state of the games being played, for per-keystroke feedback on the play page.
+#
+# A GameState holds the givens, the player's entries and, per row/column/box, how many times each digit is
+# entered. Those counts make both "is this cell in conflict" and "which digits are still possible here" O(1)
+# questions, so a move only revisits the changed cell and its peers (20 on 9x9) instead of the board.
+# Play is judged by the rules alone, never against a stored solution: many bank puzzles have more than one, and
+# any full board without a conflict is solved. A hint gives the digit its technique forces, and only searches the
+# board when no single is left, so it is worked out when asked for, never as part of a move.
+#
+# A GameStore lives in the memory of one process. Games are only found by requests served by the process that
+# started them, so the app runs as a single process with threads (see the README).
+import secrets
+import threading
+from collections import OrderedDict
+
+try:
+    from .candidate_masks import CandidateMasks
+    from .peer_tables import peer_tables
+    from .propagation import Propagator
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from candidate_masks import CandidateMasks
+    from peer_tables import peer_tables
+    from propagation import Propagator
+
+
+class GameState:
+    def __init__(self, puzzle): #2D list, 0 marking an empty cell
+        tables = peer_tables(len(puzzle))
+        self.tables = tables
+        self.size = size = tables.size
+        self.givens = [cell for row in puzzle for cell in row]
+        self.values = [0] * tables.cells
+        self.unit_counts = [[0] * (size + 1) for _ in range(3 * size)] #entries of each digit in each unit (rows, columns, boxes)
+        self.unit_used = [0] * (3 * size) #candidate bits of the digits entered at least once in each unit
+        self.candidates = [0] * tables.cells #candidate word of every empty cell, 0 for filled cells
+        self.conflicts = set() #cells whose digit is entered again in one of their units
+        self.singles = set() #empty cells with exactly one candidate left
+        self.entered = {} #cells the player filled, oldest entry first
+        self.filled = 0
+        self.lock = threading.Lock() #held by the caller around move/reset, a player may send moves in parallel
+        for idx, num in enumerate(self.givens):
+            if num:
+                self._enter(idx, num)
+        for idx in range(tables.cells):
+            self._refresh(idx)
+        for idx, num in enumerate(self.givens):
+            if num:
+                self._check(idx)
+
+    def _units(self, idx):
+        tables = self.tables
+        return tables.row_of[idx], self.size + tables.col_of[idx], 2 * self.size + tables.box_of[idx]
+
+    def _enter(self, idx, num):
+        self.values[idx] = num
+        self.filled += 1
+        for unit in self._units(idx):
+            self.unit_counts[unit][num] += 1
+            self.unit_used[unit] |= 1 << (num - 1)
+
+    def _erase(self, idx):
+        num = self.values[idx]
+        self.values[idx] = 0
+        self.filled -= 1
+        for unit in self._units(idx):
+            counts = self.unit_counts[unit]
+            counts[num] -= 1
+            if not counts[num]:
+                self.unit_used[unit] &= ~(1 << (num - 1))
+
+    def _refresh(self, idx): #recomputes the candidates of one cell from its three units
+        if self.values[idx]:
+            word = 0
+        else:
+            row, col, box = self._units(idx)
+            word = self.tables.all_digits & ~(self.unit_used[row] | self.unit_used[col] | self.unit_used[box])
+        self.candidates[idx] = word
+        if word and not word & (word - 1):
+            self.singles.add(idx)
+        else:
+            self.singles.discard(idx)
+
+    def _check(self, idx): #updates whether one cell's digit is repeated in its units
+        num = self.values[idx]
+        if num and any(self.unit_counts[unit][num] > 1 for unit in self._units(idx)):
+            self.conflicts.add(idx)
+        else:
+            self.conflicts.discard(idx)
+
+    def move(self, idx, num):
+        """
+        Enters num in cell idx, or clears it when num is 0, and updates only that cell and its peers
+
+        Returns:
+        dict: the cell's value, the candidate digits of the cell and its peers, every cell in conflict and whether
+            the board is solved. Raises ValueError for a given cell, an index off the board or a digit out of range.
+        """
+        if not 0 <= idx < self.tables.cells or not 0 <= num <= self.size:
+            raise ValueError(f"Expected a cell 0-{self.tables.cells - 1} and a digit 0-{self.size}")
+        if self.givens[idx]:
+            raise ValueError(f"Cell {idx} is a given")
+        old = self.values[idx]
+        if old != num:
+            if old:
+                self._erase(idx)
+            if num:
+                self._enter(idx, num)
+            self.entered.pop(idx, None)
+            if num:
+                self.entered[idx] = num
+            peers = self.tables.peers[idx]
+            self._refresh(idx)
+            self._check(idx)
+            for peer in peers:
+                self._refresh(peer)
+                if self.values[peer] in (old, num):
+                    self._check(peer)
+        changed = (idx,) + self.tables.peers[idx]
+        return {
+            'cell': idx,
+            'value': num,
+            'candidates': {peer: self.candidate_digits(peer) for peer in changed if not self.values[peer]},
+            'conflicts': sorted(self.conflicts),
+            'solved': self.solved,
+        }
+
+    def reset(self): #clears every entry of the player, keeping the givens
+        for idx, num in enumerate(self.values):
+            if num and not self.givens[idx]:
+                self._erase(idx)
+        self.entered.clear()
+        for idx in range(self.tables.cells):
+            self._refresh(idx)
+            self._check(idx)
+
+    def candidate_digits(self, idx):
+        word = self.candidates[idx]
+        return [d + 1 for d in range(self.size) if word >> d & 1]
+
+    @property
+    def solved(self):
+        return self.filled == self.tables.cells and not self.conflicts
+
+    def hint(self):
+        """
+        The next step a player could take, as a dict with cell, value and technique, or None once solved
+
+        An entry in conflict comes first ('mistake', value 0 to clear it). Then, when the entries leave the board
+        without any solution, the latest entry ('dead_end', value 0). Otherwise a naked single from the tracked
+        set, then a hidden single (a digit with one place left in a unit), each with the digit it forces. When
+        neither reaches a cell, the cell with the fewest candidates gets its digit from a solution of the board
+        as it stands ('solution').
+        """
+        mistakes = [idx for idx in self.conflicts if not self.givens[idx]]
+        if mistakes:
+            return {'cell': min(mistakes), 'value': 0, 'technique': 'mistake'}
+        size = self.size
+        state = CandidateMasks([self.values[row * size:row * size + size] for row in range(size)])
+        if not state.consistent or not state.search(Propagator()):
+            if not self.entered:
+                return None #the puzzle itself has no solution, there is nothing to take back
+            return {'cell': next(reversed(self.entered)), 'value': 0, 'technique': 'dead_end'}
+        if self.singles:
+            idx = min(self.singles)
+            return {'cell': idx, 'value': self.candidates[idx].bit_length(), 'technique': 'naked_single'}
+        candidates = self.candidates
+        for unit in self.tables.units:
+            once = twice = 0
+            for idx in unit:
+                word = candidates[idx]
+                twice |= once & word
+                once |= word
+            once &= ~twice
+            if once:
+                for idx in unit:
+                    bits = candidates[idx] & once
+                    if bits:
+                        return {'cell': idx, 'value': (bits & -bits).bit_length(), 'technique': 'hidden_single'}
+        empty = [idx for idx, num in enumerate(self.values) if not num]
+        if not empty:
+            return None
+        bit_count = self.tables.bit_count
+        idx = min(empty, key=lambda i: bit_count[candidates[i]])
+        return {'cell': idx, 'value': state.values[idx], 'technique': 'solution'}
+
+    def as_dict(self): #full state for a page that (re)loads a game
+        return {
+            'values': self.values[:],
+            'conflicts': sorted(self.conflicts),
+            'solved': self.solved,
+        }
+
+
+class GameStore:
+    def __init__(self, maxsize=4096): #the least recently played games are dropped past maxsize
+        self.maxsize = maxsize
+        self._games = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._games)
+
+    def new(self, puzzle): #starts a game and returns its id
+        game_id = secrets.token_urlsafe(8)
+        state = GameState(puzzle)
+        with self._lock:
+            self._games[game_id] = state
+            while len(self._games) > self.maxsize:
+                self._games.popitem(last=False)
+        return game_id
+
+    def get(self, game_id): #the game's state, or None when the id is unknown or the game was dropped
+        with self._lock:
+            state = self._games.get(game_id)
+            if state is not None:
+                self._games.move_to_end(game_id)
+            return state
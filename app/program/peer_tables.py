@@ -0,0 +1,107 @@
+# Precomputed index tables for Sudoku boards of any box size n: 4x4 (n = 2), 9x9 (n = 3), 16x16 (n = 4), 25x25 (n = 5).
+# Cells are addressed by their flat index row * size + col, and digit d of a candidate word is the bit 1 << (d - 1).
+# The tables of a size are built once and shared by every solver, generator and validator from then on: the 9x9
+# tables at import, the other sizes the first time a board of that size is seen. Nothing in them is ever mutated.
+import math
+
+SIZES = (4, 9, 16, 25)
+SYMBOLS = '.123456789ABCDEFGHIJKLMNOP' #one character per cell value, '.' for an empty cell (values 10-25 are A-P)
+
+
+class _BitCount: #indexed like the BIT_COUNT tuple, for sizes where a tuple of every candidate word would be too big
+    def __getitem__(self, word):
+        return bin(word).count('1')
+
+
+class PeerTables:
+    def __init__(self, box): #box is the box side n, the board is n*n cells wide
+        size = box * box
+        cells = size * size
+        self.box = box
+        self.size = size
+        self.cells = cells
+        self.all_digits = (1 << size) - 1
+        self.row_of = tuple(i // size for i in range(cells))
+        self.col_of = tuple(i % size for i in range(cells))
+        self.box_of = tuple((i // (size * box)) * box + (i % size) // box for i in range(cells))
+
+        # The 3 * size units (rows, then columns, then boxes) as tuples of cell indices.
+        self.units = tuple(
+            tuple(i for i in range(cells) if key[i] == k)
+            for key in (self.row_of, self.col_of, self.box_of)
+            for k in range(size)
+        )
+
+        # The cells sharing a row, column or box with each cell (20 on 9x9, 39 on 16x16, 64 on 25x25).
+        self.peers = tuple(
+            tuple(j for j in sorted(set(self.units[self.row_of[i]]) | set(self.units[size + self.col_of[i]])
+                                    | set(self.units[2 * size + self.box_of[i]])) if j != i)
+            for i in range(cells)
+        )
+
+        # The same peers as (row, col) pairs, for the code that indexes 2D boards (sets backend, generator).
+        self.peer_cells = tuple(tuple((self.row_of[j], self.col_of[j]) for j in peers) for peers in self.peers)
+
+        # Every row/box and column/box crossing as (the n shared cells, rest of the line, rest of the box).
+        self.intersections = tuple(
+            (tuple(i for i in line if self.box_of[i] == b),
+             tuple(i for i in line if self.box_of[i] != b),
+             tuple(i for i in self.units[2 * size + b] if i not in line))
+            for line in self.units[:2 * size]
+            for b in sorted(set(self.box_of[i] for i in line))
+        )
+
+        # The 8 symmetries of the square (rotations and reflections) as cell orders: cell k of the transformed board is
+        # cell symmetries[s][k] of the original. Each one maps valid boards to valid boards.
+        rc = [(i // size, i % size) for i in range(cells)]
+        last = size - 1
+        self.symmetries = tuple(
+            tuple(r2 * size + c2 for r2, c2 in ((f(r, c) if not t else f(c, r)) for r, c in rc))
+            for t in (False, True)
+            for f in (lambda r, c: (r, c), lambda r, c: (r, last - c), lambda r, c: (last - r, c),
+                      lambda r, c: (last - r, last - c))
+        )
+
+        self.bit_count = tuple(bin(word).count('1') for word in range(self.all_digits + 1)) if size <= 16 else _BitCount()
+        self.digit_of_bit = {1 << d: d + 1 for d in range(size)}
+
+        # Every undo-trail entry either places a digit or removes at least one candidate bit, so at most cells
+        # placements and cells * size removals are live at once.
+        self.trail_size = cells + cells * size
+
+
+_TABLES = {}
+
+
+def peer_tables(size): #the shared tables for size x size boards. Raises ValueError for a size not in SIZES.
+    tables = _TABLES.get(size)
+    if tables is None:
+        if size not in SIZES:
+            raise ValueError(f"Unsupported board size: {size}, expected one of {SIZES}")
+        tables = _TABLES.setdefault(size, PeerTables(math.isqrt(size)))
+    return tables
+
+
+def grid_text(board): #one character per cell in reading order, e.g. the 81 character strings the play page uses
+    return ''.join(SYMBOLS[cell] for row in board for cell in row)
+
+
+def parse_grid(text):
+    """
+    Reads a board written either as space separated cell values ('2 4 . 3 ...', '.' or 0 for an empty cell)
+    or as one character per cell ('24.3...' with A-P for 10-25)
+
+    Returns:
+    list: size x size 2D list, 0 marking an empty cell. Raises ValueError when the cell count is not that of a supported size.
+    """
+    tokens = text.split()
+    if len(tokens) == 1:
+        tokens = list(tokens[0])
+    size = math.isqrt(len(tokens))
+    if size not in SIZES or size * size != len(tokens):
+        raise ValueError(f"Expected the cells of a {'/'.join(f'{s}x{s}' for s in SIZES)} board, got {len(tokens)}")
+    cells = [int(token) if token.isdigit() else SYMBOLS.index(token.upper()) for token in tokens]
+    return [cells[row * size:row * size + size] for row in range(size)]
+
+
+peer_tables(9) #the standard board's tables are ready before the first request
@@ -0,0 +1,122 @@
+# Logical deductions applied to a CandidateMasks state before each search step.
+# Every deduction goes through CandidateMasks.place/eliminate, so it lands on the trail and the search undoes it on backtrack.
+# The units and row/box crossings come from the state's peer tables, so the same Propagator works on any board size.
+TECHNIQUES = ('naked_single', 'hidden_single', 'naked_pair', 'pointing', 'box_line')
+
+
+class Propagator:
+    def __init__(self, techniques=TECHNIQUES): #techniques can be any subset of TECHNIQUES, tried in the given order (TECHNIQUES is cheapest first)
+        unknown = set(techniques) - set(TECHNIQUES)
+        if unknown:
+            raise ValueError(f"Unknown propagation techniques: {sorted(unknown)}")
+        self.techniques = tuple(techniques)
+        self.hits = dict.fromkeys(TECHNIQUES, 0) #how often each technique placed a digit or removed candidates
+
+    def propagate(self, state): #applies the techniques until none of them changes the state. Returns False on a contradiction.
+        steps = [getattr(self, '_' + name) for name in self.techniques]
+        hits = self.hits
+        while True:
+            for name, step in zip(self.techniques, steps):
+                progress = step(state)
+                if progress is None:
+                    return False
+                if progress:
+                    hits[name] += progress
+                    break #start again from the first technique
+            else:
+                return True
+
+    # Each technique returns the number of changes it made, or None when the state cannot be completed.
+
+    def _naked_single(self, state): #an empty cell with a single candidate takes it
+        values, candidates = state.values, state.candidates
+        bit_count, digit_of_bit = state.tables.bit_count, state.tables.digit_of_bit
+        placed = 0
+        for idx in range(state.cells):
+            if not values[idx]:
+                word = candidates[idx]
+                if bit_count[word] == 1:
+                    if not state.place(idx, digit_of_bit[word]):
+                        return None
+                    placed += 1
+                elif not word:
+                    return None
+        return placed
+
+    def _hidden_single(self, state): #a digit that fits in only one cell of a unit goes there
+        values, candidates = state.values, state.candidates
+        all_digits, digit_of_bit = state.tables.all_digits, state.tables.digit_of_bit
+        placed = 0
+        for unit in state.tables.units:
+            once = twice = filled = 0
+            for idx in unit:
+                word = candidates[idx]
+                if values[idx]:
+                    filled |= word
+                else:
+                    twice |= once & word
+                    once |= word
+            if (once | filled) != all_digits:
+                return None #some digit has no place left in this unit
+            singles = once & ~twice & ~filled
+            while singles:
+                bit = singles & -singles
+                singles ^= bit
+                for idx in unit:
+                    if candidates[idx] & bit and not values[idx]:
+                        if not state.place(idx, digit_of_bit[bit]):
+                            return None
+                        placed += 1
+                        break
+        return placed
+
+    def _naked_pair(self, state): #two cells of a unit sharing the same two candidates remove them from the rest of the unit
+        values, candidates = state.values, state.candidates
+        bit_count = state.tables.bit_count
+        changed = 0
+        for unit in state.tables.units:
+            pairs = {}
+            for idx in unit:
+                word = candidates[idx]
+                if not values[idx] and bit_count[word] == 2:
+                    if word in pairs:
+                        other = pairs[word]
+                        for peer in unit:
+                            if peer != idx and peer != other and not values[peer] and candidates[peer] & word:
+                                if not state.eliminate(peer, word):
+                                    return None
+                                changed += 1
+                    else:
+                        pairs[word] = idx
+        return changed
+
+    def _pointing(self, state): #a digit confined to one line inside a box leaves the rest of that line
+        return self._intersections(state, pointing=True)
+
+    def _box_line(self, state): #a digit confined to one box inside a line leaves the rest of that box
+        return self._intersections(state, pointing=False)
+
+    def _intersections(self, state, pointing):
+        values, candidates = state.values, state.candidates
+        changed = 0
+        for shared, rest_of_line, rest_of_box in state.tables.intersections:
+            inside = 0
+            for idx in shared:
+                if not values[idx]:
+                    inside |= candidates[idx]
+            if not inside:
+                continue
+            keep, clear = (rest_of_box, rest_of_line) if pointing else (rest_of_line, rest_of_box)
+            outside = 0
+            for idx in keep:
+                if not values[idx]:
+                    outside |= candidates[idx]
+            confined = inside & ~outside
+            if not confined:
+                continue
+            for idx in clear:
+                if not values[idx] and candidates[idx] & confined:
+                    if not state.eliminate(idx, confined):
+                        return None
+                    changed += 1
+        return changed
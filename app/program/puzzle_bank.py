@@ -0,0 +1,188 @@
+# Packed puzzle bank opened with mmap, replacing the pandas load of sudoku_results.csv.
+#
+# File layout (little endian):
+#   header   'SDKB', version (u16), cells per grid (u16), number of difficulty levels (u16), number of puzzles (u32)
+#   index    one entry per level: name (16 bytes, NUL padded), first record (u32), record count (u32)
+#   records  puzzle grid then solution grid, one byte per cell (0 = empty), grouped by difficulty level
+#
+# Because every level is a contiguous run of fixed-size records, picking a random puzzle of a level is a single
+# randrange and a slice of the map, whatever the size of the bank. Nothing is read until a record is asked for.
+import csv
+import math
+import mmap
+import os
+import random
+import struct
+
+try:
+    from .peer_tables import SIZES, SYMBOLS, parse_grid
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from peer_tables import SIZES, SYMBOLS, parse_grid
+
+MAGIC = b'SDKB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHHI')
+LEVEL_ENTRY = struct.Struct('<16sII')
+GRID_CELLS = tuple(size * size for size in SIZES) #81 on 9x9, 256 on 16x16, ...
+
+TO_TEXT = bytes.maketrans(bytes(range(len(SYMBOLS))), SYMBOLS.encode('ascii')) #cell byte -> character used in the play page
+FROM_TEXT = bytes.maketrans(b'0' + SYMBOLS.encode('ascii'), bytes([0]) + bytes(range(len(SYMBOLS))))
+
+
+def encode_grid(text): #'2 4 . 3 ...' (CSV) or a one character per cell string ('24.3...', A-P for 10-25) -> one byte per cell
+    tokens = text.split()
+    if len(tokens) > 1 and max(map(len, tokens)) > 1: #two digit values of a 16x16 or 25x25 CSV
+        return bytes(cell for row in parse_grid(text) for cell in row)
+    packed = ''.join(tokens).encode('ascii')
+    if len(packed) not in GRID_CELLS:
+        raise ValueError(f"Expected {' or '.join(map(str, GRID_CELLS))} cells, got {len(packed)}")
+    return packed.translate(FROM_TEXT)
+
+
+def convert_csv(csv_path, bank_path, level_column='difficulty_level', exclude_levels=()):
+    """
+    Converts a puzzle CSV (sudoku_generated, sudoku_solved, difficulty_level) into a packed bank file
+
+    level_column picks the column the bank is grouped by, e.g. 'grade' for a CSV written by difficulty_grader,
+    and rows whose level is in exclude_levels (say 'invalid' and 'expert') are left out of the bank.
+
+    Two streaming passes over the CSV: the first counts puzzles per level, the second writes each record
+    straight into its slot. Memory use does not depend on the number of puzzles. The bank is written to a
+    temporary file and renamed into place, so readers never see a half-written bank.
+    """
+    counts = {}
+    cells = None #cells per grid, taken from the first puzzle, every other grid has to match it
+    with open(csv_path, newline='') as file:
+        for record in csv.DictReader(file):
+            level = record[level_column]
+            if level not in exclude_levels:
+                counts[level] = counts.get(level, 0) + 1
+                if cells is None:
+                    cells = len(encode_grid(record['sudoku_generated']))
+
+    for level in counts:
+        if len(level.encode('utf-8')) > LEVEL_ENTRY.size - 8: #the name field would cut it, and lookups by the full name would fail
+            raise ValueError(f"Level name {level!r} is longer than {LEVEL_ENTRY.size - 8} bytes")
+    starts, total = {}, 0
+    for level, count in counts.items():
+        starts[level] = total
+        total += count
+    data_start = HEADER.size + LEVEL_ENTRY.size * len(counts)
+    cells = cells or GRID_CELLS[1] #an empty bank is written as 9x9
+    record_size = 2 * cells
+
+    tmp_path = f"{bank_path}.{os.getpid()}.tmp" #per process, several workers may convert at once
+    with open(tmp_path, 'wb') as out:
+        out.write(HEADER.pack(MAGIC, VERSION, cells, len(counts), total))
+        for level, count in counts.items():
+            out.write(LEVEL_ENTRY.pack(level.encode('utf-8'), starts[level], count))
+        out.truncate(data_start + total * record_size)
+        written = dict.fromkeys(counts, 0)
+        with open(csv_path, newline='') as file:
+            for record in csv.DictReader(file):
+                level = record[level_column]
+                if level in exclude_levels:
+                    continue
+                grids = encode_grid(record['sudoku_generated']) + encode_grid(record['sudoku_solved'])
+                if len(grids) != record_size:
+                    out.close()
+                    os.remove(tmp_path)
+                    raise ValueError(f"Expected {cells} cells per grid like the first puzzle, got {len(grids) // 2}")
+                out.seek(data_start + (starts[level] + written[level]) * record_size)
+                out.write(grids)
+                written[level] += 1
+    os.replace(tmp_path, bank_path)
+    return total
+
+
+class PuzzleBank:
+    def __init__(self, path): #maps the bank read-only, only the header and level index are parsed
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: #an empty file cannot be mapped
+            self._file.close()
+            raise ValueError(f"{path} is not a puzzle bank")
+        magic, version, cells, n_levels, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not a puzzle bank")
+        self.cells = cells
+        self.count = count
+        self.record_size = 2 * cells
+        self.levels = {} #difficulty -> (first record, record count)
+        for k in range(n_levels):
+            name, start, n = LEVEL_ENTRY.unpack_from(self._map, HEADER.size + k * LEVEL_ENTRY.size)
+            self.levels[name.rstrip(b'\0').decode('utf-8')] = (start, n)
+        self.data_start = HEADER.size + LEVEL_ENTRY.size * n_levels
+
+    def __len__(self):
+        return self.count
+
+    def difficulty_of(self, index):
+        for level, (start, n) in self.levels.items():
+            if start <= index < start + n:
+                return level
+        raise IndexError(f"Puzzle {index} is not in the bank")
+
+    def get(self, index): #the record at index, with the same keys as a sudoku_results.csv row plus its id
+        if not 0 <= index < self.count:
+            raise IndexError(f"Puzzle {index} is not in the bank")
+        offset = self.data_start + index * self.record_size
+        record = self._map[offset:offset + self.record_size]
+        return {
+            'id': index,
+            'sudoku_generated': record[:self.cells].translate(TO_TEXT).decode('ascii'),
+            'sudoku_solved': record[self.cells:].translate(TO_TEXT).decode('ascii'),
+            'difficulty_level': self.difficulty_of(index), #the level the bank was grouped by
+        }
+
+    def puzzle_bytes(self, index): #the givens of a puzzle as packed cells, 0 for an empty cell
+        if not 0 <= index < self.count:
+            raise IndexError(f"Puzzle {index} is not in the bank")
+        offset = self.data_start + index * self.record_size
+        return self._map[offset:offset + self.cells]
+
+    def solution_bytes(self, index): #the stored solution of a puzzle as packed cells (one byte per cell, no text decoding)
+        if not 0 <= index < self.count:
+            raise IndexError(f"Puzzle {index} is not in the bank")
+        offset = self.data_start + index * self.record_size + self.cells
+        return self._map[offset:offset + self.cells]
+
+    def random_index(self, difficulty, rng=random): #O(1) draw of a puzzle id of the given level
+        if difficulty not in self.levels or not self.levels[difficulty][1]:
+            raise ValueError(f"No Sudoku puzzles found for difficulty: {difficulty}")
+        start, n = self.levels[difficulty]
+        return start + rng.randrange(n)
+
+    def random_puzzle(self, difficulty, rng=random):
+        return self.get(self.random_index(difficulty, rng))
+
+    def as_array(self): #zero-copy (N, 2, size, size) uint8 view of all records (puzzle, solution) for numpy audits
+        import numpy as np
+        size = math.isqrt(self.cells)
+        return np.frombuffer(self._map, dtype=np.uint8, count=self.count * self.record_size,
+                             offset=self.data_start).reshape(self.count, 2, size, size)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def open_bank(bank_path, csv_path=None): #opens a bank, (re)building it first when the CSV is newer than the bank
+    if csv_path is not None and (not os.path.exists(bank_path)
+                                 or os.path.getmtime(csv_path) > os.path.getmtime(bank_path)):
+        convert_csv(csv_path, bank_path)
+    return PuzzleBank(bank_path)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) not in (3, 4):
+        sys.exit("usage: python puzzle_bank.py <puzzles.csv> <bank file> [level column]")
+    if len(sys.argv) == 4: #e.g. 'grade': serve by measured difficulty, leaving out non-unique and too hard puzzles
+        total = convert_csv(sys.argv[1], sys.argv[2], sys.argv[3], exclude_levels=('invalid', 'expert'))
+    else:
+        total = convert_csv(sys.argv[1], sys.argv[2])
+    print(f"Wrote {total} puzzles to {sys.argv[2]}")
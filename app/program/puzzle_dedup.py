@@ -0,0 +1,266 @@
+# Duplicate detection for the puzzle bank. Two puzzles are duplicates when one can be turned into the other by the
+# Sudoku symmetry group: transposing, reordering bands, rows within a band, stacks and columns within a stack, and
+# relabelling the digits. minimal_form() gives every equivalence class one representative, and its 64-bit hash
+# goes into DedupIndex, an on-disk open-addressing table checked in O(1) per puzzle. A 9x9 puzzle costs a few
+# milliseconds, boards with many interchangeable empty or full rows are capped at MAX_STATES tied transforms.
+#
+# Index file layout (little endian): header 'SDKD', version (u16), padding (u16), capacity (u64), entries (u64),
+# padding to 32 bytes, then capacity u64 slots. 0 marks an empty slot, fingerprints are never 0. The table is
+# mapped, so opening it reads nothing and a lookup touches a slot or two, whatever the number of entries.
+import csv
+import hashlib
+import itertools
+import math
+import mmap
+import os
+import struct
+
+try:
+    from .peer_tables import parse_grid
+    from .solution_cache import canonical_form
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from peer_tables import parse_grid
+    from solution_cache import canonical_form
+
+MAGIC = b'SDKD'
+VERSION = 1
+HEADER = struct.Struct('<4sHHQQ4x') #padded to 32 bytes, so the slots are 8-byte aligned
+MAX_LOAD = 0.7 #the table doubles before more than this share of slots is taken
+MIN_CLUES = {4: 4, 9: 17} #no puzzle with fewer clues has a unique solution. The full group search covers these sizes.
+MAX_STATES = 8192 #tied transforms minimal_form follows before giving up, bounds its time on very regular boards
+
+_COLUMN_ORDERS = {}
+
+
+def column_orders(size): #every column order the group allows: the stacks in any order, the columns of each stack in any order
+    orders = _COLUMN_ORDERS.get(size)
+    if orders is None:
+        n = math.isqrt(size)
+        within = [list(itertools.permutations(range(s * n, s * n + n))) for s in range(n)]
+        orders = [sum(parts, ())
+                  for stack_order in itertools.permutations(range(n))
+                  for parts in itertools.product(*(within[s] for s in stack_order))]
+        _COLUMN_ORDERS[size] = orders
+    return orders
+
+
+def _first_rows(grids, size, n):
+    """
+    The states (orientation, (row,), column order, labels) that give the smallest first row, built directly
+    instead of reading every row in all 1296 column orders. The digits of a row are distinct, so once relabelled
+    a row is only its pattern of empty cells: the smallest one puts the stacks with the most empty cells first
+    and, within every stack, the empty cells before the filled ones. Every column order doing that is a tie.
+    """
+    best, states = None, []
+    stack_orders = list(itertools.permutations(range(n)))
+    for g, grid in enumerate(grids):
+        for r, line in enumerate(grid):
+            empty = [sum(1 for c in range(s * n, s * n + n) if not line[c]) for s in range(n)]
+            shape = sorted(empty, reverse=True) #larger is better: more leading empty cells
+            if best is not None and shape < best:
+                continue
+            if best is None or shape > best:
+                best, states = shape, []
+            for stack_order in stack_orders:
+                if [empty[s] for s in stack_order] != shape:
+                    continue
+                within = [[zeros + filled
+                           for zeros in itertools.permutations([c for c in range(s * n, s * n + n) if not line[c]])
+                           for filled in itertools.permutations([c for c in range(s * n, s * n + n) if line[c]])]
+                          for s in stack_order]
+                for parts in itertools.product(*within):
+                    order = sum(parts, ())
+                    labels = {0: 0}
+                    for c in order:
+                        if line[c]:
+                            labels[line[c]] = len(labels)
+                    states.append((g, (r,), order, labels))
+    return states
+
+
+def minimal_form(board, max_states=MAX_STATES):
+    """
+    Finds the smallest board, read row by row with digits relabelled in order of first appearance (0 for an empty
+    cell), over the whole Sudoku symmetry group of a 4x4 or 9x9 board
+
+    The rows are picked one at a time. Every (orientation, row choice, column order) that gives the smallest
+    prefix so far is kept, the others are dropped as soon as one of their cells is larger. Ties only survive
+    while rows are indistinguishable (empty rows, a run of full rows), and how many survive is the same for
+    every board of an equivalence class, so boards that keep more than max_states of them alive are given up on
+    the same way whichever copy is asked for.
+
+    Returns:
+    bytes: the minimal form, one byte per cell, or None when more than max_states transforms stay tied. Raises
+        ValueError for other sizes, for boards with fewer clues than any unique puzzle has and for boards with a
+        digit repeated in a row or column.
+    """
+    size = len(board)
+    if size not in MIN_CLUES:
+        raise ValueError(f"The full symmetry group is only searched for sizes {tuple(MIN_CLUES)}, got {size}")
+    if sum(1 for row in board for cell in row if cell) < MIN_CLUES[size]:
+        raise ValueError(f"A {size}x{size} puzzle needs at least {MIN_CLUES[size]} clues")
+    n = math.isqrt(size)
+    grids = (tuple(map(tuple, board)), tuple(zip(*board)))
+    for grid in grids:
+        for line in grid:
+            digits = [cell for cell in line if cell]
+            if len(set(digits)) != len(digits):
+                raise ValueError("A digit is repeated in a row or column")
+    states = _first_rows(grids, size, n)
+    g, rows, order, labels = states[0]
+    form = [labels[grids[g][rows[0]][c]] for c in order]
+    for position in range(1, size):
+        if len(states) > max_states:
+            return None
+        best, survivors = None, []
+        for g, rows, order, labels in states:
+            if position % n == 0: #first row of a band: any row of a band not used yet
+                used = {r // n for r in rows}
+                choices = [r for b in range(n) if b not in used for r in range(b * n, b * n + n)]
+            else: #the other rows of the current band
+                band = rows[-1] // n
+                choices = [r for r in range(band * n, band * n + n) if r not in rows]
+            for r in choices:
+                line = grids[g][r]
+                new_labels = labels
+                key = []
+                for c in order:
+                    value = line[c]
+                    label = new_labels.get(value)
+                    if label is None:
+                        if new_labels is labels:
+                            new_labels = dict(labels)
+                        label = new_labels[value] = len(new_labels)
+                    key.append(label)
+                    if best is not None and key > best[:len(key)]:
+                        break #already larger than the best row, whatever the rest of it is
+                else:
+                    if best is None or key < best:
+                        best, survivors = key, []
+                    survivors.append((g, rows + (r,), order, new_labels))
+        states = survivors
+        form.extend(best)
+    return bytes(form)
+
+
+def fingerprint(board): #64-bit hash of the puzzle's equivalence class, never 0
+    key = minimal_form(board) if len(board) in MIN_CLUES else None
+    if key is None: #16x16 and up, or too regular a board: rotations, reflections and relabelling only
+        key = b'R' + canonical_form(board)[0] #kept apart from the minimal forms, equivalent boards may then be missed but never merged
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), 'little') or 1
+
+
+class DedupIndex:
+    def __init__(self, path, capacity=1 << 16, readonly=False): #opens the index at path, creating an empty one of capacity slots (a power of two). A read-only index must exist.
+        self.path = path
+        self.readonly = readonly #lookups only, several processes can map the same file, e.g. the workers of a build
+        if not readonly and not os.path.exists(path):
+            self._create(path, capacity)
+        self._open()
+
+    @staticmethod
+    def _create(path, capacity):
+        if capacity < 8 or capacity & (capacity - 1):
+            raise ValueError(f"Capacity must be a power of two of at least 8, got {capacity}")
+        with open(path, 'wb') as file:
+            file.write(HEADER.pack(MAGIC, VERSION, 0, capacity, 0))
+            file.truncate(HEADER.size + 8 * capacity)
+
+    def _open(self):
+        self._file = open(self.path, 'rb' if self.readonly else 'r+b')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ if self.readonly else mmap.ACCESS_WRITE)
+        magic, version, _, capacity, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or len(self._map) != HEADER.size + 8 * capacity:
+            self.close()
+            raise ValueError(f"{self.path} is not a dedup index")
+        self.capacity = capacity
+        self.count = count
+        self._slots = memoryview(self._map)[HEADER.size:].cast('Q')
+
+    def __len__(self):
+        return self.count
+
+    def _slot(self, key): #slot holding key, or the empty slot where it would go (linear probing)
+        slots, mask = self._slots, self.capacity - 1
+        i = key & mask
+        while slots[i] and slots[i] != key:
+            i = (i + 1) & mask
+        return i
+
+    def contains_key(self, key):
+        return self._slots[self._slot(key)] == key
+
+    def add_key(self, key): #True if key was new and is now in the index, False for a duplicate
+        if self.readonly:
+            raise ValueError(f"{self.path} is open read-only")
+        i = self._slot(key)
+        if self._slots[i]:
+            return False
+        if (self.count + 1) > MAX_LOAD * self.capacity:
+            self._grow()
+            i = self._slot(key)
+        self._slots[i] = key
+        self.count += 1
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, 0, self.capacity, self.count)
+        return True
+
+    def __contains__(self, board):
+        return self.contains_key(fingerprint(board))
+
+    def add(self, board):
+        return self.add_key(fingerprint(board))
+
+    def _grow(self): #rehashes into a table twice the size, written next to the index and renamed over it
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        self._create(tmp_path, 2 * self.capacity)
+        bigger = DedupIndex(tmp_path)
+        for key in self._slots:
+            if key:
+                bigger._slots[bigger._slot(key)] = key
+        bigger.count = self.count
+        HEADER.pack_into(bigger._map, 0, MAGIC, VERSION, 0, bigger.capacity, bigger.count)
+        bigger.close()
+        self.close()
+        os.replace(tmp_path, self.path)
+        self._open()
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        self._slots = None
+        self._map.close()
+        self._file.close()
+
+
+def dedup_csv(in_path, out_path, index, column='sudoku_generated'):
+    """
+    Copies a puzzle CSV, leaving out every puzzle already in index (or seen earlier in the file) and adding the
+    others to it. Streams row by row, so it works on banks of any size.
+
+    Returns:
+    dict: number of puzzles kept and dropped
+    """
+    kept = dropped = 0
+    with open(in_path, newline='') as file, open(out_path, 'w', newline='') as out:
+        reader = csv.DictReader(file)
+        writer = csv.DictWriter(out, reader.fieldnames)
+        writer.writeheader()
+        for row in reader:
+            if index.add(parse_grid(row[column])):
+                writer.writerow(row)
+                kept += 1
+            else:
+                dropped += 1
+    return {'kept': kept, 'dropped': dropped}
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) != 4:
+        sys.exit("usage: python puzzle_dedup.py <index file> <puzzles.csv> <deduplicated.csv>")
+    index = DedupIndex(sys.argv[1])
+    try:
+        print(dedup_csv(sys.argv[2], sys.argv[3], index))
+    finally:
+        index.close()
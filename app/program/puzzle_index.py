@@ -0,0 +1,53 @@
+# In-memory difficulty -> puzzle id index, built once at startup and shared by every request.
+# Draws are O(1): a random position in a level's id array, or the next step of a per-session permutation
+# when a visitor should not see the same puzzle twice before the level is exhausted.
+import math
+import random
+from array import array
+
+
+class DifficultyIndex:
+    def __init__(self, ids_by_level): #difficulty -> iterable of puzzle ids, stored as compact uint32 arrays
+        self.ids = {level: array('I', ids) for level, ids in ids_by_level.items()}
+
+    @classmethod
+    def from_bank(cls, bank): #one entry per level of a PuzzleBank, no record is read
+        return cls({level: range(start, start + n) for level, (start, n) in bank.levels.items()})
+
+    def _ids(self, level):
+        ids = self.ids.get(level)
+        if not ids:
+            raise ValueError(f"No Sudoku puzzles found for difficulty: {level}")
+        return ids
+
+    def count(self, level):
+        return len(self.ids.get(level, ()))
+
+    def random_id(self, level, rng=random):
+        ids = self._ids(level)
+        return ids[rng.randrange(len(ids))]
+
+    def draw_unseen(self, level, state=None, rng=random):
+        """
+        Draws a puzzle id the caller has not seen since its state was created
+
+        The ids of a level are visited in the order (step * k + shift) % n with step coprime to n, which is a
+        permutation of 0..n-1. state only holds step, shift and k, so it fits in a session cookie no matter
+        how large the level is. A new permutation starts once every id has been drawn, or the level changed size.
+
+        Parameters:
+        level (str): difficulty to draw from
+        state (dict): value returned by the previous call for this level, or None
+
+        Returns:
+        tuple: (puzzle id, new state)
+        """
+        ids = self._ids(level)
+        n = len(ids)
+        if not state or state.get('n') != n or state['k'] >= n:
+            step = rng.randrange(1, n) if n > 1 else 1
+            while math.gcd(step, n) != 1:
+                step = rng.randrange(1, n)
+            state = {'n': n, 'step': step, 'shift': rng.randrange(n), 'k': 0}
+        position = (state['step'] * state['k'] + state['shift']) % n
+        return ids[position], dict(state, k=state['k'] + 1)
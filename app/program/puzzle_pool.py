@@ -0,0 +1,158 @@
+# Background pre-generation of fresh puzzles, so a route can hand out a never-seen puzzle without generating inline.
+# One bounded queue per difficulty is refilled between a low and a high watermark: once a queue drops to the
+# low mark it is topped up to the high mark, then left alone. Generation runs in worker processes so it does
+# not compete with request threads for the GIL. get() never blocks, an empty queue returns None and the caller
+# falls back to the puzzle bank.
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+try:
+    from .sudoku_game_v5 import SudokuGame
+    from .Solver_experiment_unified import UnifiedSolver
+    from .difficulty_grader import GRADES, grade_puzzle
+    from .peer_tables import grid_text
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from sudoku_game_v5 import SudokuGame
+    from Solver_experiment_unified import UnifiedSolver
+    from difficulty_grader import GRADES, grade_puzzle
+    from peer_tables import grid_text
+
+
+def generate_verified(difficulty, attempts=400):
+    """
+    Generates one puzzle whose measured grade (see difficulty_grader) is the given difficulty
+
+    Clue counts only loosely follow the grade, most carvings grade 'easy' at every clue range, so puzzles above
+    easy are carved with the fewest clues, where the harder grades turn up most often, and kept only when
+    grade_puzzle agrees. Runs in a worker process. Returns a record with the same keys as a puzzle bank record
+    plus its grade (id is None, the puzzle is not in the bank), or None if no attempt graded at that level.
+    """
+    carve = difficulty if difficulty == GRADES[0] else 'hard'
+    for _ in range(attempts):
+        game = SudokuGame(difficulty=carve)
+        puzzle = [row[:] for row in game.generate_game()]
+        grade = grade_puzzle(puzzle)['grade'] #'invalid' unless the solution is unique
+        if grade != difficulty:
+            continue
+        solver = UnifiedSolver([row[:] for row in puzzle])
+        if solver.solve():
+            return {
+                'id': None,
+                'sudoku_generated': grid_text(puzzle),
+                'sudoku_solved': grid_text(solver.board),
+                'difficulty_level': grade,
+                'grade': grade,
+            }
+    return None
+
+
+class PuzzlePool:
+    def __init__(self, difficulties=('easy', 'medium', 'hard'), low_watermark=4, high_watermark=16, workers=1,
+                 generate=generate_verified):
+        if not 0 <= low_watermark < high_watermark:
+            raise ValueError("Expected 0 <= low_watermark < high_watermark")
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.workers = workers #worker processes, 0 generates in the background thread itself
+        self.generate = generate #called as generate(difficulty) in the worker, must be picklable
+        self.queues = {level: deque() for level in difficulties}
+        self.refilling = dict.fromkeys(difficulties, True) #every queue starts empty, so it starts below the low mark
+        self.in_flight = dict.fromkeys(difficulties, 0)
+        self.served = dict.fromkeys(difficulties, 0)
+        self._condition = threading.Condition()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        if not self.running:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._run, name='puzzle-pool', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def get(self, difficulty): #a ready puzzle record, or None when the queue is empty (never blocks)
+        queue = self.queues.get(difficulty)
+        if not queue:
+            return None
+        try:
+            puzzle = queue.popleft()
+        except IndexError: #emptied by another request in between
+            return None
+        self.served[difficulty] += 1
+        if len(queue) <= self.low_watermark and not self.refilling[difficulty]:
+            with self._condition:
+                self.refilling[difficulty] = True
+                self._condition.notify_all()
+        return puzzle
+
+    def qsize(self, difficulty):
+        return len(self.queues[difficulty])
+
+    def _wanted(self): #levels still below their high mark, emptiest first
+        wanted = [level for level, queue in self.queues.items()
+                  if self.refilling[level] and len(queue) + self.in_flight[level] < self.high_watermark]
+        return sorted(wanted, key=lambda level: len(self.queues[level]) + self.in_flight[level])
+
+    def _store(self, level, puzzle):
+        with self._condition:
+            self.in_flight[level] -= 1
+            if puzzle is not None:
+                self.queues[level].append(puzzle)
+            if len(self.queues[level]) >= self.high_watermark:
+                self.refilling[level] = False
+
+    def _run(self):
+        if self.workers == 0:
+            self._run_inline()
+            return
+        pending = {}
+        # Spawned, not forked, for the same reason as in solver_service: this runs in a thread of a threaded server
+        with ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+            while not self._stopped.is_set():
+                with self._condition:
+                    wanted = self._wanted()
+                    while not wanted and not pending and not self._stopped.is_set():
+                        self._condition.wait()
+                        wanted = self._wanted()
+                    for level in wanted:
+                        if len(pending) >= self.workers:
+                            break
+                        self.in_flight[level] += 1
+                        pending[executor.submit(self.generate, level)] = level
+                if pending:
+                    done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        level = pending.pop(future)
+                        self._store(level, future.result() if future.exception() is None else None)
+            for future in pending:
+                future.cancel()
+
+    def _run_inline(self):
+        while not self._stopped.is_set():
+            with self._condition:
+                wanted = self._wanted()
+                while not wanted and not self._stopped.is_set():
+                    self._condition.wait()
+                    wanted = self._wanted()
+                if self._stopped.is_set():
+                    return
+                level = wanted[0]
+                self.in_flight[level] += 1
+            try:
+                puzzle = self.generate(level)
+            except Exception:
+                puzzle = None
+            self._store(level, puzzle)
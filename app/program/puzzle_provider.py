@@ -0,0 +1,44 @@
+# Lazily opened puzzle bank and difficulty index for the web app.
+# Importing the routes no longer touches the disk, the bank is mapped on the first request that needs it,
+# or up front through prewarm() when a worker should pay that cost before taking traffic.
+import threading
+
+try:
+    from .puzzle_bank import open_bank
+    from .puzzle_index import DifficultyIndex
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from puzzle_bank import open_bank
+    from puzzle_index import DifficultyIndex
+
+
+class PuzzleProvider:
+    def __init__(self, bank_path, csv_path=None): #csv_path is converted into the bank when the bank is missing or stale
+        self.bank_path = bank_path
+        self.csv_path = csv_path
+        self._lock = threading.Lock()
+        self._bank = None
+        self._index = None
+
+    def _load(self):
+        if self._index is None: #double-checked so that loaded workers never take the lock
+            with self._lock:
+                if self._index is None:
+                    self._bank = open_bank(self.bank_path, self.csv_path)
+                    self._index = DifficultyIndex.from_bank(self._bank)
+        return self._bank, self._index
+
+    @property
+    def bank(self):
+        return self._load()[0]
+
+    @property
+    def index(self):
+        return self._load()[1]
+
+    @property
+    def loaded(self):
+        return self._index is not None
+
+    def prewarm(self): #opens the bank now, e.g. from create_app(prewarm=True) or a gunicorn post_fork hook
+        self._load()
+        return self
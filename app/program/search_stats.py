@@ -0,0 +1,111 @@
+# Opt-in instrumentation for UnifiedSolver and CandidateMasks searches.
+# Pass a SearchStats to the solver to record how much work a solve took. Without one the solver runs its
+# untraced search functions, so there is no bookkeeping at all on the normal path.
+#
+# A SearchBudget is a SearchStats that also stops the search: past max_nodes nodes, past max_seconds of wall time
+# since it was created, or once its CancelToken is cancelled (from any thread). The check runs at the search nodes,
+# so it is cooperative and costs nothing on the untraced path either. See UnifiedSolver.solve_with_budget.
+import threading
+import time
+
+
+class SearchStats:
+    def __init__(self, on_node=None): #on_node(depth, idx) is called for every search node, idx is the flat cell index (0-80) branched on, -1 at a leaf (solved or contradiction)
+        self.on_node = on_node
+        self.reset()
+
+    def reset(self):
+        self.solves = 0 #top-level solve/count calls recorded
+        self.nodes = 0 #search nodes expanded
+        self.backtracks = 0 #placements tried and undone again
+        self.max_depth = 0
+        self.eliminations = 0 #candidate words changed by constraint propagation
+        self.seconds = 0.0 #wall time spent in the recorded calls
+
+    def timed(self, search, *args): #runs one top-level search and adds its wall time
+        start = time.perf_counter()
+        try:
+            return search(*args)
+        finally:
+            self.seconds += time.perf_counter() - start
+            self.solves += 1
+
+    def enter(self, depth, idx): #one node at the given depth
+        self.nodes += 1
+        if depth > self.max_depth:
+            self.max_depth = depth
+        if self.on_node is not None:
+            self.on_node(depth, idx)
+
+    def as_dict(self):
+        return {
+            'solves': self.solves,
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'eliminations': self.eliminations,
+            'seconds': round(self.seconds, 6),
+        }
+
+
+class CancelToken:
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self): #asks every search using this token to stop at its next check
+        self._event.set()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+
+class BudgetExceeded(Exception): #unwinds a search out of its budget, SearchBudget.timed turns it into a result
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class SearchBudget(SearchStats):
+    CHECK_EVERY = 64 #default nodes between two looks at the clock and the cancel token, a power of two
+
+    def __init__(self, max_nodes=None, max_seconds=None, cancel=None, on_node=None, check_every=None): #None leaves that limit off. The clock starts now and is shared by every search run on this budget.
+        if check_every is not None and (check_every < 1 or check_every & (check_every - 1)):
+            raise ValueError(f"check_every must be a power of two, got {check_every}")
+        self.max_nodes = max_nodes
+        self.max_seconds = max_seconds
+        self.cancel = cancel
+        # 1 for searches whose nodes take milliseconds, where 64 of them would overrun max_seconds by a second
+        self.check_every = check_every or self.CHECK_EVERY
+        super().__init__(on_node)
+
+    def reset(self):
+        super().reset()
+        self.exceeded = None #'nodes', 'time' or 'cancelled' once a limit stopped a search
+        self.deadline = None if self.max_seconds is None else time.perf_counter() + self.max_seconds
+
+    def check(self): #raises BudgetExceeded when the time is up or the search was cancelled
+        if self.cancel is not None and self.cancel.cancelled:
+            raise BudgetExceeded('cancelled')
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExceeded('time')
+
+    def timed(self, search, *args): #returns None instead of running once the budget is spent, or when it runs out mid-search
+        if self.exceeded is not None:
+            return None
+        try:
+            self.check()
+            return super().timed(search, *args)
+        except BudgetExceeded as e:
+            self.exceeded = e.reason
+            return None
+
+    def enter(self, depth, idx):
+        super().enter(depth, idx)
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded('nodes')
+        if not self.nodes & (self.check_every - 1):
+            self.check()
+
+    def as_dict(self):
+        return dict(super().as_dict(), exceeded=self.exceeded)
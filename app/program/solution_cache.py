@@ -0,0 +1,182 @@
+# Memoized solving, keyed by a canonical form of the puzzle so that equivalent puzzles share one entry.
+#
+# Two puzzles are equivalent when one is the other rotated or reflected (the 8 symmetries of the square) with its
+# digits relabelled. The canonical form is the smallest of the 8 transformed boards, each relabelled in order of
+# first appearance (the first digit read becomes 1, the next new one 2, ...). A solution is stored in canonical
+# coordinates and labels, and mapped back through the transform of whichever puzzle asks for it, so solving a
+# rotated or relabelled copy of a cached puzzle is a lookup.
+#
+# Persistence file layout (little endian): header 'SDKC', version (u16), number of entries (u32), then per entry
+# cells per grid (u16), canonical puzzle and canonical solution, one byte per cell. An all-zero solution records
+# a puzzle without any solution.
+import os
+import struct
+import threading
+from collections import OrderedDict
+
+try:
+    from .Solver_experiment_unified import UnifiedSolver
+    from .peer_tables import peer_tables
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from Solver_experiment_unified import UnifiedSolver
+    from peer_tables import peer_tables
+
+MAGIC = b'SDKC'
+VERSION = 1
+HEADER = struct.Struct('<4sHI')
+ENTRY = struct.Struct('<H')
+
+
+def canonical_form(board):
+    """
+    Finds the canonical form of a board
+
+    Parameters:
+    board (list): size x size 2D list, 0 marking an empty cell
+
+    Returns:
+    tuple: (key, order, labels). key is the canonical board as bytes, one per cell. order is the symmetry used
+        (cell k of the canonical board is cell order[k] of board) and labels maps every digit 0-size of board to
+        its canonical digit. Raises ValueError for an unsupported board size.
+    """
+    tables = peer_tables(len(board))
+    flat = [cell for row in board for cell in row]
+    best = None
+    for order in tables.symmetries:
+        labels = {0: 0}
+        key = bytes([labels.setdefault(flat[i], len(labels)) for i in order])
+        if best is None or key < best[0]:
+            best = (key, order, labels)
+    key, order, labels = best
+    # Digits missing from the puzzle take the spare canonical digits in order, so labels maps whole solutions too
+    spare = range(len(labels), tables.size + 1)
+    labels.update(zip((d for d in range(1, tables.size + 1) if d not in labels), spare))
+    return key, order, labels
+
+
+class SolutionCache:
+    def __init__(self, maxsize=4096, path=None, backend='bitmask'): #path loads earlier entries when the file exists, save() writes them back
+        self.maxsize = maxsize
+        self.path = path
+        self.backend = backend #UnifiedSolver backend used on a miss
+        self._entries = OrderedDict() #canonical puzzle -> canonical solution, least recently used first
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, board): #the cached solution of board (or of any equivalent puzzle) as a new 2D list. Returns None on a miss.
+        key, order, labels = canonical_form(board)
+        with self._lock:
+            solution = self._entries.get(key)
+            if solution is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return self._restore(solution, order, labels, len(board))
+
+    def put(self, board, solution): #stores the solution of board, None when the board has no solution
+        key, order, labels = canonical_form(board)
+        if solution is None:
+            stored = bytes(len(key))
+        else:
+            flat = [cell for row in solution for cell in row]
+            stored = bytes([labels[flat[i]] for i in order])
+        self._store(key, stored)
+
+    def solve(self, board):
+        """
+        Solves board through the cache
+
+        Returns:
+        list: the solution as a new 2D list (the first one found if the puzzle has several), or None when the board
+            has no solution. Unsolvable boards are cached too. The board itself is not modified.
+        """
+        key, order, labels = canonical_form(board)
+        with self._lock:
+            solution = self._entries.get(key)
+            if solution is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if solution is None:
+            solver = UnifiedSolver([row[:] for row in board], 'hard', self.backend)
+            solved = solver.solve()
+            flat = [cell for row in solver.board for cell in row]
+            solution = bytes([labels[flat[i]] for i in order]) if solved else bytes(len(key))
+            self._store(key, solution)
+        return self._restore(solution, order, labels, len(board))
+
+    def _store(self, key, solution):
+        with self._lock:
+            self._entries[key] = solution
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    @staticmethod
+    def _restore(solution, order, labels, size): #maps a canonical solution back onto the board it was asked for
+        if not any(solution):
+            return None
+        digits = {canonical: digit for digit, canonical in labels.items()}
+        flat = [0] * len(solution)
+        for k, i in enumerate(order):
+            flat[i] = digits[solution[k]]
+        return [flat[row * size:row * size + size] for row in range(size)]
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def clear(self): #drops every entry and resets the counters
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def save(self, path=None): #writes every entry, least recently used first, to a temporary file renamed into place
+        path = path or self.path
+        if path is None:
+            raise ValueError("No path to save the solution cache to")
+        with self._lock:
+            entries = list(self._entries.items())
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as out:
+            out.write(HEADER.pack(MAGIC, VERSION, len(entries)))
+            for key, solution in entries:
+                out.write(ENTRY.pack(len(key)))
+                out.write(key)
+                out.write(solution)
+        os.replace(tmp_path, path)
+        return len(entries)
+
+    def load(self, path): #adds the entries of a saved cache, keeping at most maxsize of them
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < HEADER.size:
+            raise ValueError(f"{path} is not a solution cache")
+        magic, version, count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a solution cache")
+        offset = HEADER.size
+        for _ in range(count):
+            (cells,) = ENTRY.unpack_from(data, offset)
+            offset += ENTRY.size
+            self._store(data[offset:offset + cells], data[offset + cells:offset + 2 * cells])
+            offset += 2 * cells
+        return count
@@ -0,0 +1,109 @@
+# Solving for the web app in a small process pool, so the solver's CPU use stays bounded however many requests
+# come in, and a slow board never holds the interpreter lock of the process serving pages.
+#
+# The request thread still waits for the result, for at most the deadline plus a little slack: there is no async
+# serving path (Flask's async views need asgiref, which the app does not depend on, and it is served by WSGI
+# workers). A waiting thread is cheap with threaded workers, so the app runs as one process with more threads than
+# max_pending (see the README), and the limits below then hold for the whole deployment. With several processes
+# every one of them would have its own pool and its own max_pending. The pool's workers are spawned, not forked:
+# the pool starts inside a threaded server, and a forked child would inherit whatever locks other threads held.
+#
+# Every call has a deadline counted from submission (queueing included). The worker stops the solve itself when
+# the deadline passes, so a pathological board frees its worker too, not just the waiting request. At most
+# max_pending calls are queued or running at once, further calls fail straight away with ServiceBusy, which the
+# routes turn into 429 so a few expensive solves cannot starve page views. A node budget bounds the work of a single
+# call whatever its deadline, which matters for large, nearly empty boards sent by clients.
+#
+# Solutions are remembered in a SolutionCache in the serving process: a board equivalent to one solved before
+# (rotated, reflected or relabelled) is answered from it without taking a pool slot, even when the pool is busy.
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+try:
+    from .batch_solver import solve_one
+    from .solution_cache import SolutionCache
+    from .Solver_experiment_unified import UnifiedSolver
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from batch_solver import solve_one
+    from solution_cache import SolutionCache
+    from Solver_experiment_unified import UnifiedSolver
+
+
+class ServiceBusy(Exception):
+    pass
+
+
+def _solve_by(board, backend, deadline_at, max_nodes): #runs in a pool worker, with whatever is left of the deadline
+    remaining = deadline_at - time.time()
+    if remaining <= 0: #waited in the queue past the deadline
+        return {'index': 0, 'status': 'timeout', 'solution': None, 'seconds': 0.0}
+    return solve_one(0, board, backend, remaining, max_nodes)
+
+
+class SolverService:
+    def __init__(self, workers=2, max_pending=8, deadline=2.0, max_nodes=100000, cache_size=4096):
+        self.workers = workers
+        self.max_pending = max_pending #queued plus running calls before new ones are refused
+        self.deadline = deadline #default seconds per call
+        self.max_nodes = max_nodes #search nodes allowed per call, None for no limit
+        self.cache = SolutionCache(cache_size) if cache_size else None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pool = None #started on the first solve, importing the routes stays cheap
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _release(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def solve(self, board, deadline=None, backend='bitmask'):
+        """
+        Solves board in the pool, waiting at most deadline seconds
+
+        Returns:
+        dict: the batch_solver result ('status' is 'solved', 'unsolvable', 'invalid', 'timeout', 'budget_exceeded'
+            or 'error', with 'solution' and 'seconds'). Raises ServiceBusy when max_pending calls are already in flight
+            and the board is not in the cache.
+        """
+        deadline = deadline or self.deadline
+        if self.cache is not None and UnifiedSolver.validate_board(board):
+            solution = self.cache.get(board)
+            if solution is not None:
+                return {'index': 0, 'status': 'solved', 'solution': solution, 'seconds': 0.0}
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise ServiceBusy(f"{self._pending} solves already in flight")
+            self._pending += 1
+        try:
+            future = self._executor().submit(_solve_by, board, backend, time.time() + deadline, self.max_nodes)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release) #the slot frees up when the worker is done, not when the caller gives up
+        try:
+            result = future.result(timeout=deadline + 0.5) #the worker stops itself at the deadline, the slack covers pickling
+        except FutureTimeout:
+            future.cancel() #only succeeds while it is still queued
+            return {'index': 0, 'status': 'timeout', 'solution': None, 'seconds': deadline}
+        if self.cache is not None and result['status'] == 'solved':
+            self.cache.put(board, result['solution'])
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
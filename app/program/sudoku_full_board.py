@@ -1,15 +1,144 @@
 import random
 import math
+try:
+    from .candidate_masks import CandidateMasks
+    from .propagation import Propagator
+    from .peer_tables import peer_tables
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from candidate_masks import CandidateMasks
+    from propagation import Propagator
+    from peer_tables import peer_tables
+
+MODES = ('diagonal', 'transform', 'shuffled')
+
 
 class SudokuGenerator:
-    def __init__(self, board_size):
+    def __init__(self, board_size, mode='diagonal'):
+        if mode not in MODES:
+            raise ValueError(f"Unknown generation mode: {mode}")
         self.board_size = board_size #Fixed board size for standard Sudoku
         self.subgrid_size = int(math.sqrt(board_size))
+        self.tables = peer_tables(board_size) #shared with the solvers, raises ValueError for an unsupported size
+        self.mode = mode #'diagonal' fills the diagonal boxes then backtracks, 'transform' shuffles a canonical grid, 'shuffled' backtracks with random candidate order
         self.board = [[0 for _ in range(board_size)] for _ in range(board_size)]
 
     def generate_full_board(self):
-        self._fill_diagonal()
-        self._fill_remaining(0, self.subgrid_size)
+        # Start from an empty board, so a generator can be reused for several boards
+        self.board = [[0 for _ in range(self.board_size)] for _ in range(self.board_size)]
+        if self.mode == 'transform':
+            self._fill_transformed()
+        elif self.mode == 'shuffled' and self.board_size > 9:
+            self._fill_constrained()
+        elif self.mode == 'shuffled':
+            self._fill_shuffled()
+        else:
+            self._fill_diagonal()
+            self._fill_remaining(0, self.subgrid_size)
+
+    def _fill_transformed(self):
+        # Applies random validity-preserving transforms to the canonical grid value(r, c) = (n * (r % n) + r // n + c) % N:
+        # band and stack order, row order within each band, column order within each stack, digit relabelling and transpose.
+        # Very fast, but every board is equivalent to the canonical grid, use 'shuffled' to reach any valid grid.
+        size, n = self.board_size, self.subgrid_size
+        rows = self._shuffled_lines()
+        cols = self._shuffled_lines()
+        digits = list(range(1, size + 1))
+        random.shuffle(digits)
+        board = [[digits[(n * (r % n) + r // n + c) % size] for c in cols] for r in rows]
+        if random.random() < 0.5:
+            board = [list(col) for col in zip(*board)]
+        self.board = board
+
+    def _shuffled_lines(self):
+        # A random line order that keeps each band (or stack) together: shuffle the bands, then the lines inside each band
+        n = self.subgrid_size
+        bands = list(range(n))
+        random.shuffle(bands)
+        order = []
+        for band in bands:
+            lines = list(range(band * n, band * n + n))
+            random.shuffle(lines)
+            order.extend(lines)
+        return order
+
+    def _fill_shuffled(self):
+        # Backtracking over the cells in order, trying the digits in a random order each time. Digits already used in
+        # each row, column and box are kept as bitmasks. Can produce any valid grid, not only relabellings of one grid.
+        # The stack is two preallocated arrays, each cell's digit order and how many of them were tried, so there is
+        # no recursion however large the board.
+        size, n = self.board_size, self.subgrid_size
+        total = size * size
+        used_rows = [0] * size
+        used_cols = [0] * size
+        used_boxes = [0] * size
+        orders = [None] * total
+        tried = [0] * total
+        board = self.board
+        k = 0
+        orders[0] = list(range(1, size + 1))
+        random.shuffle(orders[0])
+        while k < total:
+            i, j = divmod(k, size)
+            b = (i // n) * n + j // n
+            num = board[i][j]
+            if num: #back at this cell after a dead end further on, take its digit out again
+                bit = 1 << num
+                used_rows[i] ^= bit
+                used_cols[j] ^= bit
+                used_boxes[b] ^= bit
+                board[i][j] = 0
+            used = used_rows[i] | used_cols[j] | used_boxes[b]
+            order, t = orders[k], tried[k]
+            while t < size and used & (1 << order[t]):
+                t += 1
+            if t == size: #no digit left, backtrack
+                if k == 0:
+                    return False
+                k -= 1
+                continue
+            num = order[t]
+            tried[k] = t + 1
+            bit = 1 << num
+            board[i][j] = num
+            used_rows[i] |= bit
+            used_cols[j] |= bit
+            used_boxes[b] |= bit
+            k += 1
+            if k < total:
+                orders[k] = list(range(1, size + 1))
+                random.shuffle(orders[k])
+                tried[k] = 0
+        return True
+
+    def _fill_constrained(self):
+        # 'shuffled' for 16x16 and up, where filling cells in reading order has heavy-tailed run times (25x25 boards often
+        # take minutes). Fills the cell with the fewest candidates next, in random digit order, with singles propagated.
+        # A fill that needs more than 10 nodes per cell is restarted with fresh random choices.
+        propagator = Propagator(('naked_single', 'hidden_single'))
+        while True:
+            state = CandidateMasks(self.board)
+            digit_of_bit = state.tables.digit_of_bit
+            frames = [] #(cell, candidate bits not tried yet in random order, trail mark)
+            for _ in range(10 * state.cells):
+                if propagator.propagate(state):
+                    idx = state.most_constrained()
+                    if idx < 0:
+                        self.board = state.to_board()
+                        return
+                    word, bits = state.candidates[idx], []
+                    while word:
+                        bit = word & -word
+                        word ^= bit
+                        bits.append(bit)
+                    random.shuffle(bits)
+                    frames.append((idx, bits, state.mark()))
+                while frames: #back up to the deepest cell that still has a digit to try
+                    idx, bits, mark = frames[-1]
+                    state.undo(mark)
+                    if not bits:
+                        frames.pop()
+                    elif state.place(idx, digit_of_bit[bits.pop()]):
+                        break
 
     def _fill_diagonal(self):   
         # Fill diagonal subgrids with random values
@@ -38,51 +167,47 @@ class SudokuGenerator:
         return True
 
     def _fill_remaining(self, i, j):
-        # Recursive function to fill the remaining cells
-        if i == self.board_size - 1 and j == self.board_size:
-            return True
-
-        if j == self.board_size:
-            i += 1
-            j = 0
-
-        if self.board[i][j] != 0:
-            return self._fill_remaining(i, j + 1)
-
-        for num in range(1, self.board_size + 1):
-            if self._is_valid(i, j, num):
-                self.board[i][j] = num
-                if self._fill_remaining(i, j + 1):
-                    return True
-                self.board[i][j] = 0
-
-        return False
+        # Fill the empty cells from (i, j) on in reading order, backtracking with an explicit stack of the next digit
+        # to try per empty cell instead of one recursive call per cell
+        size = self.board_size
+        cells = [divmod(k, size) for k in range(i * size + j, size * size) if self.board[k // size][k % size] == 0]
+        next_num = [1] * len(cells)
+        pos = 0
+        while pos < len(cells):
+            r, c = cells[pos]
+            self.board[r][c] = 0
+            for num in range(next_num[pos], size + 1):
+                if self._is_valid(r, c, num):
+                    self.board[r][c] = num
+                    next_num[pos] = num + 1
+                    pos += 1
+                    break
+            else:
+                if pos == 0:
+                    return False
+                next_num[pos] = 1
+                pos -= 1
+        return True
 
     def _is_valid(self, i, j, num):
-        # Check if it's safe to assign 'num' to cell (i, j)
-        return (
-            self._is_valid_in_row(i, num)
-            and self._is_valid_in_col(j, num)
-            and self._is_valid_in_subgrid(i - i % self.subgrid_size, j - j % self.subgrid_size, num)
-        )
-
-    def _is_valid_in_row(self, i, num):
-        # Check if 'num' is not already used in row 'i'
-        return num not in self.board[i]
-
-    def _is_valid_in_col(self, j, num):
-        # Check if 'num' is not already used in column 'j'
-        return all(self.board[i][j] != num for i in range(self.board_size))
+        # Check if it's safe to assign 'num' to cell (i, j): not used in its row, column or subgrid (the cell itself is empty)
+        board = self.board
+        for r, c in self.tables.peer_cells[i * self.board_size + j]:
+            if board[r][c] == num:
+                return False
+        return True
 
     def print_board(self):
         # Print the Sudoku board with the same visual output as the given code chunk
+        n = self.subgrid_size
+        width = len(str(self.board_size)) #values of 10 and up take two columns on 16x16 and 25x25 boards
         for i in range(self.board_size):
-            if i % 3 == 0 and i != 0:
-                print("-" * (self.board_size * 2 + 3))
+            if i % n == 0 and i != 0:
+                print("-" * ((width + 1) * self.board_size + 2 * (n - 1) - 1))
             for j in range(self.board_size):
-                if j % 3 == 0 and j != 0:
+                if j % n == 0 and j != 0:
                     print("|", end=" ")
-                print(self.board[i][j], end=" ")
+                print(str(self.board[i][j]).rjust(width), end=" ")
             print()
 
 if __name__ == "__main__":
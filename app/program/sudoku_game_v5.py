@@ -1,17 +1,28 @@
 import random
-from sudoku_full_board import SudokuGenerator
-from Solver_experiment_unified import UnifiedSolver
+try:
+    from .sudoku_full_board import SudokuGenerator
+    from .Solver_experiment_unified import UnifiedSolver
+except ImportError: #imported as a plain script module from app/program (tests, notebooks)
+    from sudoku_full_board import SudokuGenerator
+    from Solver_experiment_unified import UnifiedSolver
+
+# Range of clues left per difficulty for each board size. Larger boards keep a bigger share of their cells: carving a
+# 16x16 board runs out of removable pairs at about 100 clues, and on 25x25 the uniqueness checks get very slow below 340.
+CLUE_RANGES = {
+    4: {'easy': (9, 10), 'medium': (7, 8), 'hard': (6, 6)},
+    9: {'easy': (36, 40), 'medium': (32, 35), 'hard': (28, 31)},
+    16: {'easy': (136, 145), 'medium': (124, 135), 'hard': (112, 123)},
+    25: {'easy': (400, 430), 'medium': (370, 399), 'hard': (350, 369)},
+}
 
 
 class SudokuGame:
-    def __init__(self, board_size=9, difficulty='easy'):
+    def __init__(self, board_size=9, difficulty='easy', generator_mode='shuffled'):
         self.board_size = board_size
-        self.generator = SudokuGenerator(board_size)
-        self.difficulty_levels = {
-            'easy': random.randint(36, 40),
-            'medium': random.randint(32, 35),
-            'hard': random.randint(28, 31)
-        }
+        self.generator = SudokuGenerator(board_size, generator_mode) #'shuffled' is ~25x faster than the original 'diagonal' fill
+        self.difficulty_levels = {level: random.randint(*clues) for level, clues in CLUE_RANGES[board_size].items()}
+        if board_size % 2 == 0: #cells are removed in symmetric pairs and there is no centre cell, so only even counts can be reached
+            self.difficulty_levels = {level: clues + clues % 2 for level, clues in self.difficulty_levels.items()}
         self.difficulty = difficulty
         self.full_board = None
         self.num_clues = None  # To store the number of clues provided in the puzzle
@@ -29,73 +40,86 @@ class SudokuGame:
             self._remove_numbers_to_puzzle(self.num_clues)
 
             # Calculate the number of clues correctly
+            target_clues = self.num_clues
             self.num_clues = sum(1 for row in self.generator.board for cell in row if cell != 0)
             self.num_empty = self.board_size ** 2 - self.num_clues
 
-            # Check if the puzzle has at least 8 different numbers from 1 to 9
-            valid_puzzle = self._check_puzzle_validity()
+            # Every removal kept the solution unique, so only retry when this board could not be carved down far enough
+            valid_puzzle = self.num_clues == target_clues and self._check_puzzle_validity()
 
         return self.generator.board
 
     def _remove_numbers_to_puzzle(self, initial_clues):
         total_clues_to_leave = initial_clues
         current_clues = self.board_size ** 2  # Start with a full board
-        while current_clues > total_clues_to_leave:
-            if self._remove_symmetric_numbers():
-                current_clues -= 2  # Two numbers are removed in each successful operation
-
-    def _remove_symmetric_numbers(self):
-        for _ in range(20):  # A limit to avoid infinite loops
-            row, col = random.randint(0, self.board_size - 1), random.randint(0, self.board_size - 1)
-            row_opp, col_opp = self.board_size - 1 - row, self.board_size - 1 - col
-            if self.generator.board[row][col] != 0 and self.generator.board[row_opp][col_opp] != 0:
-                # Make copies of the numbers being removed for potential restoration
-                num1_removed = self.generator.board[row][col]
-                num2_removed = self.generator.board[row_opp][col_opp]
-
-                # Temporarily remove the numbers
-                self.generator.board[row][col] = 0
-                self.generator.board[row_opp][col_opp] = 0
-
-                # Check if the puzzle is still valid
-                if self._check_puzzle_validity():
-                    return True  # Successful removal
-                else:
-                    # If not, revert the removal
-                    self.generator.board[row][col] = num1_removed
-                    self.generator.board[row_opp][col_opp] = num2_removed
-        return False  # Failed to remove after many tries
-
-
+        for cells in self._symmetric_groups():
+            if current_clues - len(cells) < total_clues_to_leave:
+                continue  # Would overshoot, a smaller group (the centre cell) may still fit
+            if self._remove_symmetric_numbers(cells):
+                current_clues -= len(cells)
+                if current_clues == total_clues_to_leave:
+                    break
+
+    def _symmetric_groups(self):
+        # Every cell paired with its diagonally opposite cell (the centre cell is its own opposite), in random order
+        last = self.board_size - 1
+        groups = []
+        for row in range(self.board_size):
+            for col in range(self.board_size):
+                if (row, col) <= (last - row, last - col):
+                    groups.append(sorted({(row, col), (last - row, last - col)}))
+        random.shuffle(groups)
+        return groups
+
+    def _remove_symmetric_numbers(self, cells):
+        # Temporarily remove the numbers
+        for row, col in cells:
+            self.generator.board[row][col] = 0
+
+        # Keep the removal only if the puzzle still has exactly one solution
+        if not self._has_other_solution(cells):
+            return True  # Successful removal
+        # If not, revert the removal
+        for row, col in cells:
+            self.generator.board[row][col] = self.full_board[row][col]
+        return False
+
+    def _has_other_solution(self, cells):
+        # The puzzle was unique before cells were emptied, so a second solution has to differ from full_board in one
+        # of them. Searching only for that is much cheaper than counting all solutions after every removal.
+        solver = UnifiedSolver(self.generator.board)
+        return solver.has_other_solution(self.full_board, cells)
 
     def _has_single_solution(self):
         solver = UnifiedSolver(self.generator.board)
-        return not solver.has_single_solution()
-        #Replaced with the simpler sanity check below due to the exponential time complexity of checking this for every removal
+        return solver.count_solutions(limit=2) == 1 #exact check, stops at the second solution found
 
     def _check_puzzle_validity(self):
         unique_numbers = set()
         for row in self.generator.board:
             unique_numbers.update(filter(lambda x: x != 0, row))
-        return len(unique_numbers) >= 8
+        return len(unique_numbers) >= self.board_size - 1
 
     def print_board(self):
         print(
             f"Difficulty: {self.difficulty.capitalize()}, Clues Provided: {self.num_clues}, Empty Cells: {self.num_empty}")
+        n = self.generator.subgrid_size
+        width = len(str(self.board_size))
         for i in range(self.board_size):
-            if i % 3 == 0 and i != 0:
-                print("-" * (self.board_size * 2 + 3))
+            if i % n == 0 and i != 0:
+                print("-" * ((width + 1) * self.board_size + 2 * (n - 1) - 1))
             for j in range(self.board_size):
-                if j % 3 == 0 and j != 0:
+                if j % n == 0 and j != 0:
                     print("|", end=" ")
-                print(self.generator.board[i][j] if self.generator.board[i][j] != 0 else '.', end=" ")
+                print(str(self.generator.board[i][j] or '.').rjust(width), end=" ")
             print()
 
 
-# Example usage:
-sudoku_game = SudokuGame(difficulty='hard')
-sudoku_game.generate_game()
-sudoku_game.print_board()
+if __name__ == "__main__":
+    # Example usage:
+    sudoku_game = SudokuGame(difficulty='hard')
+    sudoku_game.generate_game()
+    sudoku_game.print_board()
 
-solver = UnifiedSolver(sudoku_game.generator.board)
-print(solver.has_single_solution())
\ No newline at end of file
+    solver = UnifiedSolver(sudoku_game.generator.board)
+    print(solver.has_single_solution())
\ No newline at end of file
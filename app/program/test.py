@@ -1,7 +1,35 @@
 import unittest
+import sys
+import inspect
+import csv
+import os
+import random
+import re
+import tempfile
 from sudoku_full_board import SudokuGenerator
 from sudoku_game_v5 import SudokuGame
 from Solver_experiment_unified import UnifiedSolver
+from candidate_masks import CandidateMasks
+from dlx_solver import DLXSolver
+from propagation import Propagator
+from batch_solver import solve_many, boards_from_csv
+from batch_validator import audit_csv, board_array, conflict_masks, valid_boards
+from puzzle_bank import PuzzleBank, convert_csv
+from puzzle_index import DifficultyIndex
+from puzzle_provider import PuzzleProvider
+from puzzle_pool import PuzzlePool, generate_verified
+from difficulty_grader import grade_puzzle, is_servable
+from search_stats import CancelToken, SearchBudget, SearchStats
+from peer_tables import grid_text, parse_grid, peer_tables
+from batch_validator import load_csv_boards
+from solution_cache import SolutionCache, canonical_form
+from bank_builder import build, chunk_path, merge, verified_rows
+from puzzle_dedup import DedupIndex, dedup_csv, fingerprint, minimal_form
+from game_state import GameState, GameStore
+from solver_service import ServiceBusy, SolverService
+import time
+import itertools
+import threading
 import logging
 from sudoku_game_v5 import SudokuGame
 from Solver_experiment_unified import UnifiedSolver
@@ -107,6 +135,941 @@ class TestSudokuGame(unittest.TestCase):
         
         # Run the tests
         runner.run(suite)
+
+# A well-known hard puzzle with a unique solution, used as a fixed input below
+HARD_PUZZLE = [
+    [8, 0, 0, 0, 0, 0, 0, 0, 0],
+    [0, 0, 3, 6, 0, 0, 0, 0, 0],
+    [0, 7, 0, 0, 9, 0, 2, 0, 0],
+    [0, 5, 0, 0, 0, 7, 0, 0, 0],
+    [0, 0, 0, 0, 4, 5, 7, 0, 0],
+    [0, 0, 0, 1, 0, 0, 0, 3, 0],
+    [0, 0, 1, 0, 0, 0, 0, 6, 8],
+    [0, 0, 8, 5, 0, 0, 0, 1, 0],
+    [0, 9, 0, 0, 0, 0, 4, 0, 0],
+]
+HARD_SOLUTION = [
+    [8, 1, 2, 7, 5, 3, 6, 4, 9],
+    [9, 4, 3, 6, 8, 2, 1, 7, 5],
+    [6, 7, 5, 4, 9, 1, 2, 8, 3],
+    [1, 5, 4, 2, 3, 7, 8, 9, 6],
+    [3, 6, 9, 8, 4, 5, 7, 2, 1],
+    [2, 8, 7, 1, 6, 9, 5, 3, 4],
+    [5, 2, 1, 9, 7, 4, 3, 6, 8],
+    [4, 3, 8, 5, 2, 6, 9, 1, 7],
+    [7, 9, 6, 3, 1, 8, 4, 5, 2],
+]
+# A medium puzzle from sudoku_results.csv that has a unique solution
+MEDIUM_PUZZLE = [
+    [0, 0, 0, 2, 0, 0, 0, 0, 5],
+    [0, 5, 0, 6, 0, 8, 0, 9, 0],
+    [6, 8, 4, 9, 5, 7, 0, 0, 3],
+    [0, 9, 0, 7, 0, 0, 0, 4, 0],
+    [0, 0, 7, 0, 0, 0, 8, 0, 0],
+    [0, 2, 0, 0, 0, 1, 0, 3, 0],
+    [5, 0, 0, 3, 4, 2, 9, 6, 8],
+    [0, 3, 0, 8, 0, 6, 0, 1, 0],
+    [8, 0, 0, 0, 0, 5, 0, 0, 0],
+]
+
+
+class TestBitmaskBackend(unittest.TestCase):
+    def test_solves_hard_puzzle(self):
+        """The default backend finds the known solution of a hard puzzle."""
+        solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], 'hard')
+        self.assertTrue(solver.advanced_solve())
+        self.assertEqual(solver.board, HARD_SOLUTION)
+
+    def test_matches_sets_backend(self):
+        """Both advanced_solve backends agree on the solution of a unique puzzle."""
+        bitmask = UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'hard')
+        sets = UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'hard', backend='sets')
+        self.assertTrue(bitmask.advanced_solve())
+        self.assertTrue(sets.advanced_solve())
+        self.assertEqual(bitmask.board, sets.board)
+
+    def test_undo_restores_state(self):
+        """Undoing to a mark restores the candidate words and unit masks exactly."""
+        state = CandidateMasks(HARD_PUZZLE)
+        before = (state.values[:], state.candidates[:], state.row_used[:], state.col_used[:], state.box_used[:])
+        mark = state.mark()
+        state.place(0, 3)
+        state.place(1, 4)
+        state.undo(mark)
+        self.assertEqual(before, (state.values, state.candidates, state.row_used, state.col_used, state.box_used))
+
+    def test_conflicting_givens(self):
+        """A board whose givens repeat a digit in a row is reported unsolvable."""
+        board = [[0] * 9 for _ in range(9)]
+        board[0][0] = board[0][5] = 4
+        self.assertFalse(UnifiedSolver(board, 'hard').advanced_solve())
+
+
+class TestCountSolutions(unittest.TestCase):
+    def test_unique_puzzle(self):
+        """A puzzle with one solution is counted exactly once and left unsolved."""
+        board = [row[:] for row in HARD_PUZZLE]
+        solver = UnifiedSolver(board)
+        self.assertEqual(solver.count_solutions(), 1)
+        self.assertTrue(solver.has_single_solution())
+        self.assertEqual(board, HARD_PUZZLE)
+
+    def test_two_solution_board(self):
+        """Removing every 1 and 2 from a full board leaves more than one solution."""
+        board = [[0 if cell in (1, 2) else cell for cell in row] for row in HARD_SOLUTION]
+        solver = UnifiedSolver(board)
+        self.assertEqual(solver.count_solutions(limit=2), 2)
+        self.assertFalse(solver.has_single_solution())
+
+    def test_limit_stops_search(self):
+        """An empty board stops counting at the limit."""
+        solver = UnifiedSolver([[0] * 9 for _ in range(9)])
+        self.assertEqual(solver.count_solutions(limit=5), 5)
+
+
+class TestDLXBackend(unittest.TestCase):
+    def test_solves_hard_puzzle(self):
+        """The DLX backend finds the known solution of a hard puzzle."""
+        solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], backend='dlx')
+        self.assertTrue(solver.solve())
+        self.assertEqual(solver.board, HARD_SOLUTION)
+
+    def test_generated_games(self):
+        """The DLX backend passes the solution checks used for the generated games."""
+        checks = TestSudokuGame('verify_solution')
+        checks.correct_sum = 45
+        for difficulty in ('easy', 'medium', 'hard'):
+            game = SudokuGame(difficulty=difficulty)
+            game.generate_game()
+            solver = UnifiedSolver([row[:] for row in game.generator.board], backend='dlx')
+            self.assertTrue(solver.solve(), f"DLX failed for {difficulty} difficulty")
+            self.assertTrue(checks.verify_solution(solver.board), "Invalid solution for a sudoku puzzle.")
+
+    def test_counts_and_conflicts(self):
+        """Solution counting agrees with the bitmask backend and conflicting givens are rejected."""
+        two_solutions = [[0 if cell in (1, 2) else cell for cell in row] for row in HARD_SOLUTION]
+        self.assertEqual(DLXSolver(HARD_PUZZLE).count_solutions(), 1)
+        self.assertEqual(DLXSolver(two_solutions).count_solutions(), 2)
+        board = [[0] * 9 for _ in range(9)]
+        board[0][0] = board[4][0] = 7
+        self.assertIsNone(DLXSolver(board).solve())
+
+
+class TestPropagation(unittest.TestCase):
+    def test_logic_alone_solves_unique_puzzle(self):
+        """Propagation to a fixpoint fills a unique medium puzzle without any search."""
+        state = CandidateMasks(MEDIUM_PUZZLE)
+        propagator = Propagator()
+        self.assertTrue(propagator.propagate(state))
+        self.assertEqual(state.empty_count, 0)
+        self.assertGreater(propagator.hits['naked_single'], 0)
+
+    def test_solver_switch_and_hits(self):
+        """Solvers with and without propagation agree, and only the former reports hits."""
+        with_logic = UnifiedSolver([row[:] for row in HARD_PUZZLE], 'hard')
+        without_logic = UnifiedSolver([row[:] for row in HARD_PUZZLE], 'hard', propagate=False)
+        self.assertTrue(with_logic.solve())
+        self.assertTrue(without_logic.solve())
+        self.assertEqual(with_logic.board, without_logic.board)
+        self.assertGreater(sum(with_logic.propagation_hits().values()), 0)
+        self.assertEqual(without_logic.propagation_hits(), {})
+
+    def test_contradiction_detected(self):
+        """A digit with no possible cell left in a unit is reported as a contradiction."""
+        board = [[0] * 9 for _ in range(9)]
+        board[0][:8] = [1, 2, 3, 4, 5, 6, 7, 8]
+        board[1][8] = 9
+        self.assertFalse(Propagator().propagate(CandidateMasks(board)))
+
+    def test_rejects_unknown_technique(self):
+        with self.assertRaises(ValueError):
+            Propagator(('x_wing',))
+
+
+class TestSolveMany(unittest.TestCase):
+    def test_results_keep_input_order(self):
+        """Pool results come back in input order with a status and solution per board."""
+        boards = [HARD_PUZZLE, MEDIUM_PUZZLE, [[0] * 8 for _ in range(9)], HARD_PUZZLE]
+        results = list(solve_many(boards, workers=2, chunksize=1))
+        self.assertEqual([r['index'] for r in results], [0, 1, 2, 3])
+        self.assertEqual([r['status'] for r in results], ['solved', 'solved', 'invalid', 'solved'])
+        self.assertEqual(results[0]['solution'], HARD_SOLUTION)
+        self.assertIsNone(results[2]['solution'])
+
+    def test_per_board_timeout(self):
+        """A board exceeding the per-board timeout is reported, not waited on."""
+        results = list(solve_many([HARD_PUZZLE, MEDIUM_PUZZLE], workers=1, timeout=0.5, backend='sets'))
+        self.assertEqual([r['status'] for r in results], ['timeout', 'solved'])
+
+    def test_csv_bank(self):
+        """Every puzzle in sudoku_results.csv solves in a batch."""
+        results = list(solve_many(boards_from_csv('../sudoku_results.csv'), workers=1))
+        self.assertEqual(len(results), 60)
+        self.assertTrue(all(r['status'] == 'solved' for r in results))
+
+    def test_cached_solutions_map_back(self):
+        """A worker answering an equivalent board from its cache returns that board's own solution."""
+        digits = dict(zip(range(1, 10), (5, 3, 9, 1, 7, 2, 8, 6, 4)))
+        boards = [HARD_PUZZLE, TestSolutionCache.transformed(HARD_PUZZLE, digits)]
+        results = list(solve_many(boards, workers=2, chunksize=2, cache_size=16))
+        self.assertEqual([r['solution'] for r in results],
+                         [HARD_SOLUTION, TestSolutionCache.transformed(HARD_SOLUTION, digits)])
+
+
+class TestBatchValidator(unittest.TestCase):
+    def test_matches_check_grid_items(self):
+        """The vectorised masks agree cell by cell with check_grid_items."""
+        broken = [row[:] for row in HARD_SOLUTION]
+        broken[0][0], broken[4][4] = broken[0][1], 0
+        boards = [HARD_PUZZLE, HARD_SOLUTION, broken]
+        masks = conflict_masks(board_array(boards))
+        for board, mask in zip(boards, masks):
+            self.assertEqual((~mask).tolist(), UnifiedSolver(board).check_grid_items())
+        self.assertEqual(int(masks[2].sum()), 3)
+
+    def test_rejects_bad_input(self):
+        with self.assertRaises(ValueError):
+            board_array([[[1, 2, 3]]])
+        with self.assertRaises(ValueError):
+            board_array([[[10] * 9] * 9])
+
+    def test_audit_csv(self):
+        """The puzzle bank has no rule violations and every solution keeps its givens."""
+        report = audit_csv('../sudoku_results.csv')
+        self.assertEqual(report['boards'], 60)
+        self.assertEqual(report['invalid_puzzles'] + report['invalid_solutions'] + report['mismatched_solutions'], [])
+
+
+class TestPuzzleBank(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tmp_dir = tempfile.TemporaryDirectory()
+        cls.path = os.path.join(cls.tmp_dir.name, 'bank.bin')
+        convert_csv('../sudoku_results.csv', cls.path)
+        cls.bank = PuzzleBank(cls.path)
+        with open('../sudoku_results.csv', newline='') as file:
+            cls.rows = list(csv.DictReader(file))
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.bank.close()
+        cls.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        """Every CSV row is stored once, grouped by difficulty, with the same grids."""
+        self.assertEqual(len(self.bank), len(self.rows))
+        self.assertEqual(self.bank.levels, {'easy': (0, 20), 'medium': (20, 20), 'hard': (40, 20)})
+        stored = {(r['sudoku_generated'], r['sudoku_solved'], r['difficulty_level'])
+                  for r in map(self.bank.get, range(len(self.bank)))}
+        expected = {(''.join(r['sudoku_generated'].split()), ''.join(r['sudoku_solved'].split()), r['difficulty_level'])
+                    for r in self.rows}
+        self.assertEqual(stored, expected)
+
+    def test_solution_bytes(self):
+        """The packed solution compares directly against a submitted grid's cells."""
+        record = self.bank.get(45)
+        grid = [[int(ch) for ch in record['sudoku_solved'][row * 9:row * 9 + 9]] for row in range(9)]
+        self.assertEqual(bytes(cell for row in grid for cell in row), self.bank.solution_bytes(45))
+        self.assertEqual(bytes(self.bank.puzzle_bytes(45)), bytes(cell for row in parse_grid(record['sudoku_generated']) for cell in row))
+        with self.assertRaises(IndexError):
+            self.bank.solution_bytes(len(self.bank))
+
+    def test_random_draw_stays_in_level(self):
+        rng = random.Random(7)
+        for _ in range(50):
+            self.assertEqual(self.bank.random_puzzle('hard', rng)['difficulty_level'], 'hard')
+        with self.assertRaises(ValueError):
+            self.bank.random_index('expert')
+
+    def test_long_level_names_are_refused(self):
+        """A level name that does not fit its 16-byte field is an error, not a silently cut name."""
+        csv_path = os.path.join(self.tmp_dir.name, 'long.csv')
+        with open(csv_path, 'w', newline='') as file:
+            writer = csv.DictWriter(file, self.rows[0].keys())
+            writer.writeheader()
+            writer.writerow(dict(self.rows[0], difficulty_level='very_hard_indeed_x'))
+        with self.assertRaises(ValueError):
+            convert_csv(csv_path, os.path.join(self.tmp_dir.name, 'long.bin'))
+        self.assertFalse(os.path.exists(os.path.join(self.tmp_dir.name, 'long.bin')))
+
+    def test_array_view(self):
+        """The zero-copy view feeds the batch validator directly."""
+        records = self.bank.as_array()
+        self.assertEqual(records.shape, (60, 2, 9, 9))
+        self.assertTrue(valid_boards(records[:, 1]).all())
+        del records
+
+
+class TestDifficultyIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = DifficultyIndex({'easy': range(0, 12), 'hard': [40, 41, 47]})
+
+    def test_unseen_draws_cover_level_before_repeating(self):
+        """A session sees every puzzle of a level once before any repeat."""
+        rng = random.Random(3)
+        state, drawn = None, []
+        for _ in range(12):
+            puzzle_id, state = self.index.draw_unseen('easy', state, rng)
+            drawn.append(puzzle_id)
+        self.assertEqual(sorted(drawn), list(range(12)))
+        puzzle_id, state = self.index.draw_unseen('easy', state, rng)
+        self.assertEqual(state['k'], 1)
+
+    def test_random_id_and_missing_level(self):
+        self.assertIn(self.index.random_id('hard'), (40, 41, 47))
+        with self.assertRaises(ValueError):
+            self.index.random_id('medium')
+
+
+class TestPuzzleProvider(unittest.TestCase):
+    def test_lazy_and_loaded_once(self):
+        """Nothing is built until first use, and concurrent first uses share one bank."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bank.bin')
+            provider = PuzzleProvider(path, '../sudoku_results.csv')
+            self.assertFalse(provider.loaded)
+            self.assertFalse(os.path.exists(path))
+            banks = []
+            threads = [threading.Thread(target=lambda: banks.append(provider.bank)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertTrue(provider.loaded)
+            self.assertEqual(len({id(bank) for bank in banks}), 1)
+            self.assertEqual(provider.index.count('medium'), 20)
+            provider.bank.close()
+
+
+_puzzle_ids = itertools.count()
+
+
+def _numbered_puzzle(difficulty): #stand-in generator for the pool tests
+    return {'id': next(_puzzle_ids), 'difficulty_level': difficulty}
+
+
+class TestPuzzlePool(unittest.TestCase):
+    def wait_for(self, condition, timeout=5):
+        deadline = time.time() + timeout
+        while not condition() and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertTrue(condition())
+
+    def test_watermarks(self):
+        """Queues fill to the high mark, stay put above the low mark, then refill."""
+        pool = PuzzlePool(('easy', 'hard'), low_watermark=2, high_watermark=5, workers=0,
+                          generate=_numbered_puzzle).start()
+        try:
+            self.wait_for(lambda: pool.qsize('easy') == 5 and pool.qsize('hard') == 5)
+            for _ in range(2):
+                self.assertEqual(pool.get('easy')['difficulty_level'], 'easy')
+            time.sleep(0.05)
+            self.assertEqual(pool.qsize('easy'), 3)
+            pool.get('easy')
+            self.wait_for(lambda: pool.qsize('easy') == 5)
+            self.assertIsNone(pool.get('expert'))
+        finally:
+            pool.stop()
+        self.assertFalse(pool.running)
+
+    def test_generated_puzzle_is_unique(self):
+        record = generate_verified('easy')
+        board = [[int(c) if c != '.' else 0 for c in record['sudoku_generated'][r * 9:r * 9 + 9]] for r in range(9)]
+        self.assertEqual(UnifiedSolver(board).count_solutions(), 1)
+        self.assertTrue(all(c in (s, '.') for c, s in zip(record['sudoku_generated'], record['sudoku_solved'])))
+
+    def test_generated_puzzle_is_served_by_its_grade(self):
+        """A 'medium' puzzle is one grade_puzzle calls medium, not one carved to the medium clue count."""
+        random.seed(12)
+        record = generate_verified('medium')
+        self.assertEqual(record['difficulty_level'], 'medium')
+        self.assertEqual(grade_puzzle(parse_grid(record['sudoku_generated']))['grade'], 'medium')
+
+
+class TestGeneratorModes(unittest.TestCase):
+    def assert_full_and_valid(self, board, size=9):
+        n = int(size ** 0.5)
+        expected = list(range(1, size + 1))
+        for i in range(size):
+            self.assertEqual(sorted(board[i]), expected)
+            self.assertEqual(sorted(board[r][i] for r in range(size)), expected)
+            r0, c0 = n * (i // n), n * (i % n)
+            self.assertEqual(sorted(board[r][c] for r in range(r0, r0 + n) for c in range(c0, c0 + n)), expected)
+
+    def test_every_mode_gives_valid_boards(self):
+        """Each mode fills complete valid boards, also when the generator is reused."""
+        for mode in ('diagonal', 'transform', 'shuffled'):
+            generator = SudokuGenerator(9, mode)
+            for _ in range(3):
+                generator.generate_full_board()
+                self.assert_full_and_valid(generator.board)
+
+    def test_transform_on_16x16(self):
+        generator = SudokuGenerator(16, 'transform')
+        generator.generate_full_board()
+        self.assert_full_and_valid(generator.board, 16)
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            SudokuGenerator(9, 'latin')
+
+
+class TestUniqueCarving(unittest.TestCase):
+    def test_generated_puzzles_are_unique(self):
+        """Carved puzzles have exactly one solution, the full board, and the requested clue count."""
+        for difficulty in ('easy', 'medium', 'hard'):
+            game = SudokuGame(difficulty=difficulty)
+            puzzle = [row[:] for row in game.generate_game()]
+            self.assertEqual(game.num_clues, game.difficulty_levels[difficulty])
+            solver = UnifiedSolver(puzzle)
+            self.assertEqual(solver.count_solutions(), 1)
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.board, game.full_board)
+
+    def test_has_other_solution(self):
+        """Emptying the 1s and 2s of a full board exposes the swapped solution."""
+        cells = [(r, c) for r in range(9) for c in range(9) if HARD_SOLUTION[r][c] in (1, 2)]
+        board = [[0 if (r, c) in cells else HARD_SOLUTION[r][c] for c in range(9)] for r in range(9)]
+        self.assertTrue(UnifiedSolver(board).has_other_solution(HARD_SOLUTION, cells))
+        self.assertFalse(UnifiedSolver([row[:] for row in HARD_PUZZLE]).has_other_solution(HARD_SOLUTION, [(0, 1)]))
+
+
+class TestDifficultyGrader(unittest.TestCase):
+    def test_singles_only_is_easy(self):
+        result = grade_puzzle(MEDIUM_PUZZLE)
+        self.assertEqual(result['grade'], 'easy')
+        self.assertEqual(result['nodes'], 0)
+
+    def test_search_needed_is_expert(self):
+        """A puzzle that logic cannot finish is graded by the size of its search tree."""
+        result = grade_puzzle(HARD_PUZZLE)
+        self.assertEqual(result['hardest_technique'], 'search')
+        self.assertEqual(result['grade'], 'expert')
+        self.assertGreater(result['score'], grade_puzzle(MEDIUM_PUZZLE)['score'])
+        self.assertFalse(is_servable(result['grade']))
+
+    def test_non_unique_is_invalid(self):
+        board = [[0 if cell in (1, 2) else cell for cell in row] for row in HARD_SOLUTION]
+        self.assertEqual(grade_puzzle(board)['grade'], 'invalid')
+        self.assertFalse(is_servable('invalid'))
+
+
+class TestSearchStats(unittest.TestCase):
+    def test_records_search_work(self):
+        seen = []
+        stats = SearchStats(on_node=lambda depth, idx: seen.append(depth))
+        solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], stats=stats)
+        self.assertTrue(solver.solve())
+        self.assertEqual(solver.board, HARD_SOLUTION)
+        self.assertEqual(stats.solves, 1)
+        self.assertEqual(stats.nodes, len(seen))
+        self.assertEqual(stats.max_depth, max(seen))
+        self.assertGreater(stats.eliminations, 0)
+        self.assertGreater(stats.seconds, 0)
+
+    def test_same_search_as_untraced(self):
+        """Stats only observe the search, the results stay the same for every backend."""
+        for backend in ('bitmask', 'sets', 'dlx'):
+            plain = UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'hard', backend)
+            traced = UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'hard', backend, stats=True)
+            self.assertTrue(plain.solve())
+            self.assertTrue(traced.solve())
+            self.assertEqual(plain.board, traced.board)
+            self.assertEqual(traced.count_solutions(), 1)
+            self.assertEqual(traced.search_stats()['solves'], 2)
+        self.assertEqual(UnifiedSolver(MEDIUM_PUZZLE).search_stats(), {})
+
+    def test_basic_solve_backtracks(self):
+        stats = SearchStats()
+        solver = UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'easy', stats=stats)
+        self.assertTrue(solver.solve())
+        self.assertEqual(stats.nodes, stats.backtracks + sum(row.count(0) for row in MEDIUM_PUZZLE) + 1)
+
+
+class TestIterativeSearch(unittest.TestCase):
+    def test_no_recursion(self):
+        """The searches keep their own stack, so they run with almost no Python stack left."""
+        limit = sys.getrecursionlimit()
+        sys.setrecursionlimit(len(inspect.stack()) + 30)
+        try:
+            solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], propagate=False)
+            self.assertTrue(solver.solve())
+            self.assertEqual(solver.board, HARD_SOLUTION)
+            board = [[0 if cell in (1, 2) else cell for cell in row] for row in HARD_SOLUTION]
+            self.assertEqual(UnifiedSolver(board).count_solutions(limit=50), DLXSolver(board).count_solutions(limit=50))
+            self.assertEqual(DLXSolver(HARD_PUZZLE).solve(), HARD_SOLUTION)
+            self.assertTrue(UnifiedSolver([row[:] for row in MEDIUM_PUZZLE], 'easy').solve())
+            random.seed(0)
+            generator = SudokuGenerator(16, 'shuffled')
+            generator.generate_full_board()
+        finally:
+            sys.setrecursionlimit(limit)
+        self.assertTrue(all(sorted(row) == list(range(1, 17)) for row in generator.board))
+        self.assertTrue(all(sorted(col) == list(range(1, 17)) for col in zip(*generator.board)))
+
+
+class TestBoardSizes(unittest.TestCase):
+    def test_peer_tables(self):
+        for size, peers in ((4, 7), (9, 20), (16, 39), (25, 64)):
+            tables = peer_tables(size)
+            self.assertEqual(len(tables.units), 3 * size)
+            self.assertTrue(all(len(p) == peers for p in tables.peers))
+            self.assertIs(peer_tables(size), tables)
+        with self.assertRaises(ValueError):
+            peer_tables(10)
+
+    def test_tables_are_shared(self):
+        """Solvers and generators reuse one set of tables, peers come back without building anything."""
+        first, second = UnifiedSolver(HARD_PUZZLE), UnifiedSolver(MEDIUM_PUZZLE)
+        self.assertIs(first.tables, second.tables)
+        self.assertIs(SudokuGenerator(9).tables, first.tables)
+        self.assertIs(first.get_affected_cells(4, 4), second.get_affected_cells(4, 4))
+        affected = set(first.get_affected_cells(4, 4))
+        self.assertEqual(len(affected), 20)
+        self.assertEqual(affected, {(4, i) for i in range(9) if i != 4} | {(i, 4) for i in range(9) if i != 4}
+                         | {(r, c) for r in range(3, 6) for c in range(3, 6) if (r, c) != (4, 4)})
+
+    def test_games_on_every_backend(self):
+        """4x4 and 16x16 games are unique, and all backends find the same solution."""
+        random.seed(3)
+        for size in (4, 16):
+            game = SudokuGame(size, 'hard')
+            puzzle = game.generate_game()
+            solutions = []
+            for backend in ('bitmask', 'sets', 'dlx'):
+                solver = UnifiedSolver([row[:] for row in puzzle], 'hard', backend)
+                self.assertEqual(solver.count_solutions(), 1)
+                self.assertTrue(solver.solve())
+                solutions.append(solver.board)
+            self.assertEqual(solutions[0], game.full_board)
+            self.assertEqual(solutions[1:], solutions[:1] * 2)
+            self.assertTrue(valid_boards(board_array([puzzle, game.full_board])).all())
+        board = [[0] * 10 for _ in range(10)]
+        self.assertFalse(UnifiedSolver(board).validate_board(board))
+
+    def test_bank_round_trip_16x16(self):
+        """Two digit CSV cells are packed one byte per cell and read back as A-P characters."""
+        random.seed(4)
+        generator = SudokuGenerator(16, 'shuffled')
+        generator.generate_full_board()
+        solution = generator.board
+        puzzle = [[cell if (r + c) % 3 else 0 for c, cell in enumerate(row)] for r, row in enumerate(solution)]
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, 'big.csv')
+            with open(csv_path, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['sudoku_generated', 'sudoku_solved', 'difficulty_level'])
+                writer.writerow([' '.join(str(cell or '.') for row in puzzle for cell in row),
+                                 ' '.join(str(cell) for row in solution for cell in row), 'hard'])
+            bank_path = os.path.join(tmp_dir, 'big.bin')
+            self.assertEqual(convert_csv(csv_path, bank_path), 1)
+            self.assertEqual(load_csv_boards(csv_path).tolist(), [puzzle])
+            bank = PuzzleBank(bank_path)
+            record = bank.get(0)
+            self.assertEqual(record['sudoku_generated'], grid_text(puzzle))
+            self.assertEqual(parse_grid(record['sudoku_solved']), solution)
+            self.assertEqual(bank.as_array().shape, (1, 2, 16, 16))
+            bank.close()
+
+
+class TestSolutionCache(unittest.TestCase):
+    @staticmethod
+    def transformed(board, digits): #rotated a quarter turn, then relabelled
+        return [[digits[cell] if cell else 0 for cell in row] for row in zip(*board[::-1])]
+
+    def test_equivalent_puzzles_share_an_entry(self):
+        digits = dict(zip(range(1, 10), (5, 3, 9, 1, 7, 2, 8, 6, 4)))
+        other = self.transformed(HARD_PUZZLE, digits)
+        self.assertEqual(canonical_form(other)[0], canonical_form(HARD_PUZZLE)[0])
+        cache = SolutionCache()
+        self.assertEqual(cache.solve(HARD_PUZZLE), HARD_SOLUTION)
+        self.assertEqual(cache.solve(other), self.transformed(HARD_SOLUTION, digits))
+        self.assertEqual(cache.get(MEDIUM_PUZZLE), None)
+        stats = cache.stats()
+        self.assertEqual((stats['size'], stats['hits'], stats['misses']), (1, 1, 2))
+
+    def test_lru_eviction_and_unsolvable(self):
+        broken = [row[:] for row in HARD_PUZZLE]
+        broken[0][1] = next(cell for cell in broken[0] if cell)
+        cache = SolutionCache(maxsize=2)
+        self.assertIsNone(cache.solve(broken))
+        cache.solve(HARD_PUZZLE)
+        cache.get(broken) #now the most recently used
+        cache.solve(MEDIUM_PUZZLE)
+        self.assertEqual(cache.stats()['evictions'], 1)
+        self.assertIsNone(cache.get(HARD_PUZZLE))
+        self.assertEqual(len(cache), 2)
+
+    def test_persistence(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'solutions.bin')
+            cache = SolutionCache(path=path)
+            cache.put(HARD_PUZZLE, HARD_SOLUTION)
+            self.assertEqual(cache.save(), 1)
+            loaded = SolutionCache(path=path)
+            self.assertEqual(loaded.get(HARD_PUZZLE), HARD_SOLUTION)
+            self.assertEqual(loaded.stats()['misses'], 0)
+
+    def test_bank_verification_uses_the_cache(self):
+        """Only puzzles confirmed unique are cached, so an equivalent puzzle is verified by a lookup."""
+        digits = dict(zip(range(1, 10), (5, 3, 9, 1, 7, 2, 8, 6, 4)))
+        cache = SolutionCache()
+        puzzles = [('hard', HARD_PUZZLE, HARD_SOLUTION), ('easy', [[0] * 9 for _ in range(9)], HARD_SOLUTION),
+                   ('hard', self.transformed(HARD_PUZZLE, digits), self.transformed(HARD_SOLUTION, digits))]
+        rows = list(verified_rows(puzzles, cache))
+        self.assertEqual([row['difficulty_level'] for row in rows], ['hard', 'hard'])
+        self.assertEqual((cache.stats()['size'], cache.stats()['hits']), (1, 1))
+
+
+class TestBankBuilder(unittest.TestCase):
+    def test_resume_gives_the_same_bank(self):
+        """An interrupted build picks up the missing chunks and regenerates them exactly."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            out_dir = os.path.join(tmp_dir, 'build')
+            state = build(out_dir, 5, chunk_size=2, workers=1)
+            self.assertEqual(state['done'], [0, 1, 2])
+            with open(chunk_path(out_dir, 1)) as file:
+                before = file.read()
+            os.remove(chunk_path(out_dir, 1))
+            seen = []
+            build(out_dir, 5, chunk_size=2, workers=1, progress=lambda state: seen.append(list(state['done'])))
+            self.assertEqual(seen, [[0, 1, 2]]) #only the missing chunk was built again
+            with open(chunk_path(out_dir, 1)) as file:
+                self.assertEqual(file.read(), before)
+            csv_path = os.path.join(tmp_dir, 'bank.csv')
+            self.assertEqual(merge(out_dir, csv_path), {'kept': 5, 'dropped': 0, 'missing': 0})
+            report = audit_csv(csv_path)
+            self.assertEqual(report['invalid_puzzles'] + report['invalid_solutions'] + report['mismatched_solutions'], [])
+            with self.assertRaises(ValueError):
+                build(out_dir, 6, chunk_size=2, workers=1)
+            index = DedupIndex(os.path.join(tmp_dir, 'bank.idx'))
+            self.assertEqual(merge(out_dir, csv_path, index)['kept'], 5)
+            self.assertEqual(merge(out_dir, csv_path, index), {'kept': 0, 'dropped': 5, 'missing': 5}) #every puzzle is in the index now
+            index.close()
+
+    def test_duplicates_are_not_generated(self):
+        """A build against an index regenerates the puzzles already in it instead of writing them."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index_path = os.path.join(tmp_dir, 'bank.idx')
+            state = build(os.path.join(tmp_dir, 'first'), 4, chunk_size=2, workers=2, dedup=index_path) #no index yet
+            self.assertEqual((state['skipped'], len(state['done'])), (0, 2))
+            index = DedupIndex(index_path)
+            merge(os.path.join(tmp_dir, 'first'), os.path.join(tmp_dir, 'first.csv'), index)
+            index.close()
+            state = build(os.path.join(tmp_dir, 'second'), 4, chunk_size=2, workers=1, dedup=index_path) #same seeds, same first puzzles
+            self.assertGreaterEqual(state['skipped'], 4)
+            index = DedupIndex(index_path)
+            self.assertEqual(merge(os.path.join(tmp_dir, 'second'), os.path.join(tmp_dir, 'second.csv'), index),
+                             {'kept': 4, 'dropped': 0, 'missing': 0})
+            index.close()
+            with self.assertRaises(ValueError):
+                DedupIndex(index_path, readonly=True).add_key(1)
+
+
+class TestPuzzleDedup(unittest.TestCase):
+    @staticmethod
+    def shuffled(board, rng): #a random element of the Sudoku symmetry group applied to board
+        rows = [band * 3 + r for band in rng.sample(range(3), 3) for r in rng.sample(range(3), 3)]
+        cols = [stack * 3 + c for stack in rng.sample(range(3), 3) for c in rng.sample(range(3), 3)]
+        digits = [0] + rng.sample(range(1, 10), 9)
+        moved = [[digits[board[r][c]] for c in cols] for r in rows]
+        return [list(col) for col in zip(*moved)] if rng.random() < 0.5 else moved
+
+    def test_minimal_form_is_invariant(self):
+        rng = random.Random(11)
+        form = minimal_form(HARD_PUZZLE)
+        for _ in range(5):
+            self.assertEqual(minimal_form(self.shuffled(HARD_PUZZLE, rng)), form)
+        self.assertNotEqual(minimal_form(MEDIUM_PUZZLE), form)
+        with self.assertRaises(ValueError):
+            minimal_form([[0] * 9 for _ in range(9)])
+        with self.assertRaises(ValueError):
+            minimal_form([[1] * 9] + [[0] * 9 for _ in range(8)]) #a digit repeated in a row
+
+    def test_regular_boards_are_bounded(self):
+        """One full band and six empty rows keeps ~10**5 transforms tied; the search gives up and the fingerprint falls back."""
+        band = HARD_SOLUTION[:3] + [[0] * 9 for _ in range(6)]
+        start = time.perf_counter()
+        self.assertIsNone(minimal_form(band))
+        self.assertEqual(fingerprint(band), fingerprint([row[::-1] for row in band[::-1]]))
+        self.assertLess(time.perf_counter() - start, 2)
+
+    def test_index_grows_and_persists(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'bank.idx')
+            index = DedupIndex(path, capacity=8)
+            keys = range(1, 101)
+            self.assertTrue(all(index.add_key(key) for key in keys))
+            self.assertFalse(index.add_key(50))
+            self.assertEqual((len(index), index.capacity), (100, 256))
+            index.close()
+            index = DedupIndex(path)
+            self.assertTrue(all(index.contains_key(key) for key in keys))
+            self.assertFalse(index.contains_key(101))
+            self.assertTrue(index.add(HARD_PUZZLE))
+            self.assertIn(self.shuffled(HARD_PUZZLE, random.Random(2)), index)
+            index.close()
+
+    def test_dedup_csv(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            index = DedupIndex(os.path.join(tmp_dir, 'bank.idx'))
+            out_path = os.path.join(tmp_dir, 'unique.csv')
+            self.assertEqual(dedup_csv('../sudoku_results.csv', out_path, index), {'kept': 60, 'dropped': 0})
+            self.assertFalse(index.add(next(boards_from_csv(out_path))))
+            index.close()
+        self.assertEqual(fingerprint(HARD_PUZZLE), fingerprint(self.shuffled(HARD_PUZZLE, random.Random(5))))
+
+
+class TestGameState(unittest.TestCase):
+    def test_incremental_matches_rebuild(self):
+        """After random moves, conflicts and candidates equal those of a state built from the board afresh."""
+        rng = random.Random(8)
+        game = GameState(MEDIUM_PUZZLE)
+        empty = [i for i in range(81) if not MEDIUM_PUZZLE[i // 9][i % 9]]
+        for _ in range(300):
+            game.move(rng.choice(empty), rng.randrange(10))
+        board = [game.values[row * 9:row * 9 + 9] for row in range(9)]
+        fresh = GameState(board)
+        self.assertEqual(game.candidates, fresh.candidates)
+        self.assertEqual(game.conflicts, fresh.conflicts)
+        self.assertEqual(game.singles, fresh.singles)
+        expected = {i for i in range(81) if not UnifiedSolver(board).check_grid_items()[i // 9][i % 9]}
+        self.assertEqual(game.conflicts, expected)
+
+    def test_hints_solve_the_puzzle(self):
+        game = GameState(HARD_PUZZLE)
+        with self.assertRaises(ValueError):
+            game.move(next(i for i in range(81) if HARD_PUZZLE[i // 9][i % 9]), 1)
+        wrong = next(i for i in range(81) if not HARD_PUZZLE[i // 9][i % 9])
+        result = game.move(wrong, next(cell for cell in HARD_PUZZLE[wrong // 9] if cell)) #repeats a given of its row
+        self.assertNotIn('hint', result) #worked out on request only
+        self.assertEqual(game.hint(), {'cell': wrong, 'value': 0, 'technique': 'mistake'})
+        game.move(wrong, 0)
+        other = (set(game.candidate_digits(wrong)) - {HARD_SOLUTION[wrong // 9][wrong % 9]}).pop()
+        self.assertEqual(game.move(wrong, other)['conflicts'], []) #breaks no rule, but the puzzle is unique
+        self.assertEqual(game.hint(), {'cell': wrong, 'value': 0, 'technique': 'dead_end'})
+        techniques = set()
+        while not game.solved:
+            hint = game.hint()
+            techniques.add(hint['technique'])
+            game.move(hint['cell'], hint['value'])
+        self.assertEqual(game.values, [cell for row in HARD_SOLUTION for cell in row])
+        self.assertLessEqual({'naked_single', 'hidden_single'}, techniques)
+        self.assertIsNone(game.hint())
+        game.reset()
+        self.assertEqual(game.values, [cell for row in HARD_PUZZLE for cell in row])
+
+    def test_any_solution_solves(self):
+        """On a puzzle with many solutions, every full board without a conflict counts, hints included."""
+        game = GameState([[0] * 9 for _ in range(9)])
+        for idx in range(81):
+            game.move(idx, HARD_SOLUTION[idx // 9][idx % 9])
+        self.assertTrue(game.solved)
+        self.assertIsNone(game.hint())
+        game.reset()
+        while not game.solved:
+            hint = game.hint()
+            self.assertNotIn(hint['technique'], ('mistake', 'dead_end'))
+            game.move(hint['cell'], hint['value'])
+        self.assertEqual(game.conflicts, set())
+
+    def test_store_drops_oldest(self):
+        store = GameStore(maxsize=2)
+        first = store.new(HARD_PUZZLE)
+        second = store.new(MEDIUM_PUZZLE)
+        store.get(first)
+        store.new(HARD_PUZZLE)
+        self.assertIsNotNone(store.get(first))
+        self.assertIsNone(store.get(second))
+
+
+class TestSolverService(unittest.TestCase):
+    def test_deadline_and_backpressure(self):
+        """A slow solve is stopped at its deadline, and calls beyond max_pending are refused meanwhile."""
+        service = SolverService(workers=1, max_pending=1, cache_size=0)
+        try:
+            result = service.solve(HARD_PUZZLE)
+            self.assertEqual((result['status'], result['solution']), ('solved', HARD_SOLUTION))
+            slow = []
+            thread = threading.Thread(target=lambda: slow.append(service.solve(HARD_PUZZLE, 0.5, 'sets')))
+            thread.start()
+            time.sleep(0.1)
+            with self.assertRaises(ServiceBusy):
+                service.solve(MEDIUM_PUZZLE)
+            thread.join()
+            self.assertEqual(slow[0]['status'], 'timeout')
+            time.sleep(0.1) #the worker hands its slot back just after the result
+            self.assertEqual(service.solve(MEDIUM_PUZZLE)['status'], 'solved')
+            self.assertEqual(service.solve([[10] * 9] * 9)['status'], 'invalid')
+        finally:
+            service.shutdown()
+
+    def test_equivalent_puzzle_is_a_cache_hit(self):
+        """A rotated, relabelled copy of a solved board is answered from the cache, without a pool slot."""
+        digits = dict(zip(range(1, 10), (5, 3, 9, 1, 7, 2, 8, 6, 4)))
+        service = SolverService(workers=1)
+        try:
+            self.assertEqual(service.solve(HARD_PUZZLE)['solution'], HARD_SOLUTION)
+            service.max_pending = 0 #every call that reaches the pool is refused from here on
+            result = service.solve(TestSolutionCache.transformed(HARD_PUZZLE, digits))
+            self.assertEqual((result['status'], result['solution']),
+                             ('solved', TestSolutionCache.transformed(HARD_SOLUTION, digits)))
+            self.assertEqual(service.cache.stats()['hits'], 1)
+            with self.assertRaises(ServiceBusy):
+                service.solve(MEDIUM_PUZZLE)
+        finally:
+            service.shutdown()
+
+
+class TestSolveBudget(unittest.TestCase):
+    def test_budget_exceeded_is_a_result(self):
+        """Every backend stops at its node budget, reports why and leaves the board as it was."""
+        for backend in ('bitmask', 'sets', 'dlx'):
+            solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], 'easy', backend)
+            result = solver.solve_with_budget(max_nodes=20)
+            self.assertEqual((result['status'], result['reason'], result['solution']), ('budget_exceeded', 'nodes', None))
+            self.assertEqual(result['nodes'], 21)
+            self.assertEqual(solver.board, HARD_PUZZLE)
+            self.assertEqual(solver.solve_with_budget(max_seconds=30)['solution'], HARD_SOLUTION)
+
+    def test_time_bound_with_slow_nodes(self):
+        """The sets search takes milliseconds a node on 25x25, it still stops close to max_seconds."""
+        solver = UnifiedSolver([[0] * 25 for _ in range(25)], 'hard', 'sets')
+        start = time.perf_counter()
+        self.assertEqual(solver.solve_with_budget(max_seconds=0.3)['reason'], 'time')
+        self.assertLess(time.perf_counter() - start, 0.45)
+        with self.assertRaises(ValueError):
+            SearchBudget(check_every=3)
+
+    def test_time_and_cancel(self):
+        solver = UnifiedSolver([row[:] for row in HARD_PUZZLE], 'easy')
+        start = time.perf_counter()
+        self.assertEqual(solver.solve_with_budget(max_seconds=0.05)['reason'], 'time')
+        self.assertLess(time.perf_counter() - start, 0.5)
+        token = CancelToken()
+        budget = SearchBudget(cancel=token, on_node=lambda depth, idx: depth > 5 and token.cancel())
+        solver.stats = budget
+        self.assertFalse(solver.solve())
+        self.assertEqual(budget.exceeded, 'cancelled')
+        self.assertIsNone(budget.timed(solver.solve)) #a spent budget runs nothing more
+
+    def test_untrusted_boards(self):
+        """Anything decoded from client JSON is checked without raising."""
+        for board in (None, 'grid', {'a': 1}, [[1] * 9] * 8, [[1] * 9] * 8 + ['123456789'],
+                      [[0.5] * 4] * 4, [[True] * 4] * 4, [[5] * 4] * 4, [[0] * 10] * 10):
+            self.assertFalse(UnifiedSolver.validate_board(board))
+        self.assertEqual(UnifiedSolver([[0.5] * 4] * 4).solve_with_budget()['status'], 'invalid')
+        self.assertEqual(list(solve_many([HARD_PUZZLE], workers=1, max_nodes=5))[0]['status'], 'budget_exceeded')
+
+
+class TestRoutes(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+        from app import create_app, routes
+        cls.routes = routes
+        cls.app = create_app()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.routes.solver_service.shutdown()
+
+    def setUp(self):
+        self.client = self.app.test_client()
+
+    def open_page(self, level='easy'): #(puzzle id, game id) of a freshly served play page
+        page = self.client.get(f'/{level}').get_data(as_text=True)
+        return re.search(r'data-puzzle-id="([^"]*)"', page).group(1), re.search(r'data-game-id="([^"]*)"', page).group(1)
+
+    def check(self, grid, puzzle_id, game_id=None):
+        return self.client.post('/validate-sudoku', json={'grid': grid, 'puzzle_id': puzzle_id, 'game_id': game_id})
+
+    def test_validate_against_stored_solution(self):
+        puzzle_id, _ = self.open_page()
+        solution = parse_grid(self.routes.puzzles.bank.get(int(puzzle_id))['sudoku_solved'])
+        wrong = [row[:] for row in solution]
+        wrong[0][0], wrong[0][1] = wrong[0][1], wrong[0][0]
+        self.assertEqual(self.check(solution, puzzle_id).get_json(), {'is_valid': True})
+        self.assertEqual(self.check(wrong, puzzle_id).get_json(), {'is_valid': False})
+        for other in ('999999999', '\u00b2', '-1', 'f00', None): #unknown or garbage ids fall back to the rule check
+            self.assertEqual(self.check(solution, other).get_json(), {'is_valid': True})
+            self.assertEqual(self.check(wrong, other).get_json(), {'is_valid': False})
+        self.assertEqual(self.check('grid', puzzle_id).status_code, 400)
+
+    def test_other_solutions_of_a_bank_puzzle(self):
+        """Bank puzzle 0 has more than one solution, any of them is accepted, a grid dropping a given is not."""
+        record = self.routes.puzzles.bank.get(0)
+        puzzle, solution = parse_grid(record['sudoku_generated']), parse_grid(record['sudoku_solved'])
+
+        def other_solution(): #the first completion found with some empty cell holding another digit than the stored one
+            for idx in (k for k in range(81) if not puzzle[k // 9][k % 9]):
+                for num in set(range(1, 10)) - {solution[idx // 9][idx % 9]}:
+                    solver = UnifiedSolver([row[:] for row in puzzle])
+                    solver.board[idx // 9][idx % 9] = num
+                    if solver.solve():
+                        return solver.board
+
+        other = other_solution()
+        self.assertNotEqual(other, solution)
+        self.assertEqual(self.check(other, 0).get_json(), {'is_valid': True})
+        relabelled = [[{1: 2, 2: 1}.get(cell, cell) for cell in row] for row in solution] #no conflicts, but not this puzzle
+        partial = [row[:] for row in puzzle] #keeps the givens and breaks no rule, but is not finished
+        for grid in (relabelled, partial, [[0] * 4] * 4):
+            self.assertEqual(self.check(grid, 0).get_json(), {'is_valid': False})
+
+    def test_fresh_solution_stays_on_server(self):
+        """A pool puzzle is checked through its game, its solution never goes into the session cookie."""
+        record = dict(self.routes.puzzles.bank.get(0), id=None)
+        self.routes.puzzle_pool.queues['easy'].append(record)
+        puzzle_id, game_id = self.open_page()
+        self.assertEqual(puzzle_id, '')
+        with self.client.session_transaction() as session:
+            self.assertNotIn(record['sudoku_solved'].replace('.', ''), str(dict(session)))
+        solution = parse_grid(record['sudoku_solved'])
+        relabelled = [[{1: 2, 2: 1}.get(cell, cell) for cell in row] for row in solution] #passes the rule check, but is not the solution
+        self.assertEqual(self.check(solution, puzzle_id, game_id).get_json(), {'is_valid': True})
+        self.assertEqual(self.check(relabelled, puzzle_id, game_id).get_json(), {'is_valid': False})
+        self.assertEqual(self.check(relabelled, puzzle_id).get_json(), {'is_valid': True}) #no game, rules only
+
+    def test_game_move(self):
+        _, game_id = self.open_page()
+        game = self.routes.games.get(game_id)
+        hint = game.hint()
+        cell = hint['cell']
+        response = self.client.post(f'/game/{game_id}/move', json={'cell': cell, 'value': hint['value']})
+        self.assertEqual((response.status_code, response.get_json()['conflicts']), (200, []))
+        for body in ([1], 'text', {'cell': True, 'value': 1}, {'cell': cell, 'value': False}, {'cell': cell}):
+            self.assertEqual(self.client.post(f'/game/{game_id}/move', json=body).status_code, 400)
+        self.assertEqual(self.client.get(f'/game/{game_id}/hint').status_code, 200)
+        self.assertEqual(self.client.post('/game/unknown/move', json={'cell': cell, 'value': 1}).status_code, 404)
+
+    def test_solve_endpoint(self):
+        response = self.client.post('/solve-sudoku', json={'grid': HARD_PUZZLE})
+        self.assertEqual((response.status_code, response.get_json()), (200, {'status': 'solved', 'solution': HARD_SOLUTION}))
+        self.assertEqual(self.client.post('/solve-sudoku', json={'grid': [[1] * 9] * 9}).get_json()['status'], 'unsolvable')
+        for body in ({'grid': 'x'}, [HARD_PUZZLE], {'grid': [[0.5] * 9] * 9}):
+            self.assertEqual(self.client.post('/solve-sudoku', json=body).status_code, 400)
+        service = self.routes.solver_service
+        self.routes.solver_service = self.routes.SolverService(max_pending=0) #every slot taken
+        try:
+            response = self.client.post('/solve-sudoku', json={'grid': HARD_PUZZLE})
+            self.assertEqual((response.status_code, response.headers['Retry-After']), (429, '1'))
+        finally:
+            self.routes.solver_service = service
+
+    def test_games_are_per_process(self):
+        """A game is only known to the process that started it, another process answers 404 for it."""
+        puzzle_id, game_id = self.open_page()
+        own_games = self.routes.games
+        self.routes.games = GameStore() #what a second worker process would hold
+        try:
+            self.assertEqual(self.client.get(f'/game/{game_id}/hint').status_code, 404)
+            solution = parse_grid(self.routes.puzzles.bank.get(int(puzzle_id))['sudoku_solved'])
+            self.assertEqual(self.check(solution, puzzle_id, game_id).get_json(), {'is_valid': True}) #bank ids still work
+        finally:
+            self.routes.games = own_games
+
+
 # To run the tests
 if __name__ == "__main__":
     unittest.main()
@@ -1,22 +1,67 @@
-import pandas as pd
 import os
 from flask import Flask, request, jsonify, flash, Blueprint, render_template, request, session, redirect, url_for
+from app.program.puzzle_provider import PuzzleProvider
+from app.program.puzzle_pool import PuzzlePool
+from app.program.peer_tables import parse_grid
+from app.program.game_state import GameStore
+from app.program.solver_service import ServiceBusy, SolverService
 from app.program.Solver_experiment_unified import UnifiedSolver
-import random
 
 project_root = os.path.dirname(os.path.abspath(__file__))
 csv_path = os.path.join(project_root, 'sudoku_results.csv')
-sudoku_data = pd.read_csv(csv_path)
-sudoku_list = sudoku_data.to_dict(orient='records')
-print(sudoku_list[:5])
-
-def get_sudoku_by_difficulty(sudoku_list, level):
-    # Filter the Sudoku puzzles by the specified difficulty level
-    filtered_sudokus = [s for s in sudoku_list if s['difficulty_level'] == level]
-    if not filtered_sudokus:
-        raise ValueError(f"No Sudoku puzzles found for difficulty: {level}")
-    # Return a random Sudoku puzzle from the filtered list
-    return random.choice(filtered_sudokus)
+bank_path = os.path.join(project_root, 'sudoku_bank.bin')
+# Memory-mapped bank and difficulty index, opened on first use (or by create_app(prewarm=True)), not at import
+puzzles = PuzzleProvider(bank_path, csv_path)
+# Freshly generated, verified puzzles. Only filled once started by create_app(pregenerate=True).
+puzzle_pool = PuzzlePool()
+# Live games of this process, keyed by the id the play page carries. They are not shared between processes: run
+# the app as one process with threads (see the README). A request reaching another process gets a 404 for the
+# game, the page then loses live feedback but bank puzzles are still checked by their bank id.
+games = GameStore()
+# Bounded process pool for solver calls. The request thread waits for the result (2 s deadline at most) while the
+# solve runs in a pool worker, so the app needs more threads than the service's max_pending (see the README).
+solver_service = SolverService()
+
+def get_sudoku_by_difficulty(puzzles, level):
+    # A never-seen puzzle from the background pool when one is ready, otherwise one from the bank
+    fresh = puzzle_pool.get(level)
+    if fresh is not None:
+        return fresh
+    # Constant-time draw that does not repeat a puzzle for this session until the level is exhausted
+    # Raises ValueError if there is no puzzle for the level
+    draws = session.get('puzzle_draws', {})
+    puzzle_id, draws[level] = puzzles.index.draw_unseen(level, draws.get(level))
+    session['puzzle_draws'] = draws
+    return puzzles.bank.get(puzzle_id)
+
+def remember_puzzle(puzzle):
+    # The id the page sends back with its solution: the bank id, or '' for a fresh pool puzzle, which is checked
+    # against the givens held by its game instead. The session is a signed, not encrypted, cookie, so no
+    # solution is ever put in it.
+    return '' if puzzle['id'] is None else str(puzzle['id'])
+
+def start_game(puzzle):
+    # Server-side state for the move and hint endpoints. The session lists the visitor's games (the last few),
+    # so a game id alone does not give access to someone else's game.
+    game_id = games.new(parse_grid(puzzle['sudoku_generated']))
+    session['game_ids'] = (session.get('game_ids', []) + [game_id])[-4:]
+    return game_id
+
+def session_game(game_id):
+    if game_id not in session.get('game_ids', []):
+        return None
+    return games.get(game_id)
+
+def stored_puzzle(puzzle_id, game_id=None):
+    # Packed givens and stored solution (one byte per cell) of the puzzle a page was showing, or None for an
+    # unknown id (ad-hoc grids, dropped games). Games keep no solution, theirs is None.
+    if type(puzzle_id) is int or (isinstance(puzzle_id, str) and puzzle_id.isdecimal()):
+        try:
+            return puzzles.bank.puzzle_bytes(int(puzzle_id)), puzzles.bank.solution_bytes(int(puzzle_id))
+        except (IndexError, ValueError):
+            return None
+    game = session_game(game_id) if isinstance(game_id, str) else None
+    return (bytes(game.givens), None) if game is not None else None
 
 main = Blueprint('main', __name__)
 
@@ -27,9 +72,10 @@ def home():
 @main.route('/easy')
 def easy():
     try:
-        # Pass both sudoku_list and the level ('easy') to the function
-        puzzle = get_sudoku_by_difficulty(sudoku_list, 'easy')
-        return render_template('play.html', difficulty='easy', sudoku=list(puzzle['sudoku_generated']))
+        # Pass both puzzles and the level ('easy') to the function
+        puzzle = get_sudoku_by_difficulty(puzzles, 'easy')
+        return render_template('play.html', difficulty='easy', sudoku=list(puzzle['sudoku_generated']),
+                               puzzle_id=remember_puzzle(puzzle), game_id=start_game(puzzle))
     except ValueError as e:
         flash(str(e), 'error')
         return render_template('home.html')
@@ -38,8 +84,9 @@ def easy():
 def medium():
     try:
         # Ensure the correct level ('medium') is passed
-        puzzle = get_sudoku_by_difficulty(sudoku_list, 'medium')
-        return render_template('play.html', difficulty='medium', sudoku=list(puzzle['sudoku_generated']))
+        puzzle = get_sudoku_by_difficulty(puzzles, 'medium')
+        return render_template('play.html', difficulty='medium', sudoku=list(puzzle['sudoku_generated']),
+                               puzzle_id=remember_puzzle(puzzle), game_id=start_game(puzzle))
     except ValueError as e:
         flash(str(e), 'error')
         return render_template('home.html')
@@ -47,8 +94,9 @@ def medium():
 @main.route('/hard')
 def hard():
     try:
-        puzzle = get_sudoku_by_difficulty(sudoku_list, 'hard')  # Pass the level
-        return render_template('play.html', difficulty='hard', sudoku=list(puzzle['sudoku_generated']))
+        puzzle = get_sudoku_by_difficulty(puzzles, 'hard')  # Pass the level
+        return render_template('play.html', difficulty='hard', sudoku=list(puzzle['sudoku_generated']),
+                               puzzle_id=remember_puzzle(puzzle), game_id=start_game(puzzle))
     except ValueError as e:
         flash(str(e), 'error')
         return render_template('home.html')
@@ -94,15 +142,81 @@ def login():
 
 @main.route('/validate-sudoku', methods=['POST'])
 def validate_sudoku():
-    data = request.get_json()
-    if not data or 'grid' not in data:
+    data = request.get_json(silent=True)
+    # The grid comes from the client: a square list of lists of ints in range, checked before anything else touches it
+    if not isinstance(data, dict) or not UnifiedSolver.validate_board(data.get('grid')):
         return jsonify({'error': 'Invalid data'}), 400
 
-    # Assuming grid is a 2D list of integers representing the Sudoku board
-    grid = data['grid']
-    solver = UnifiedSolver(grid)  # Initialize your solver with the board
-    results = solver.check_grid_items()
+    # The stored solution of a served puzzle is a byte compare with no solver or numpy. Most bank puzzles have
+    # other solutions too, so any other grid that is full and keeps every given still goes through the rule check.
+    puzzle = stored_puzzle(data.get('puzzle_id'), data.get('game_id'))
+    if puzzle is not None:
+        givens, solution = puzzle
+        submitted = bytes(cell for row in data['grid'] for cell in row)
+        if submitted == solution:
+            return jsonify({'is_valid': True})
+        if len(submitted) != len(givens) or 0 in submitted or \
+                any(given and given != cell for given, cell in zip(givens, submitted)):
+            return jsonify({'is_valid': False})
+
+    # Ad-hoc grids without a known puzzle, and other completions of a served one
+    from app.program.batch_validator import board_array, conflict_masks  # numpy is only imported once a grid is checked
+    boards = board_array([data['grid']])
+    conflicts = conflict_masks(boards)[0]  # Vectorised row/column/box check, same rules as check_grid_items
 
     # Determine if the Sudoku solution is valid
-    is_valid = all(all(row) for row in results)
-    return jsonify({'is_valid': is_valid})
\ No newline at end of file
+    is_valid = not conflicts.any()
+    return jsonify({'is_valid': is_valid})
+
+
+@main.route('/game/<game_id>/move', methods=['POST'])
+def game_move(game_id):
+    # One cell changed on the play page: {'cell': 0-80, 'value': 0-9}, 0 clearing the cell
+    game = session_game(game_id)
+    if game is None:
+        return jsonify({'error': 'Unknown game'}), 404
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Invalid data'}), 400
+    cell, value = data.get('cell'), data.get('value')
+    if type(cell) is not int or type(value) is not int: #JSON true/false would pass isinstance(..., int)
+        return jsonify({'error': 'Invalid data'}), 400
+    try:
+        with game.lock:
+            result = game.move(cell, value)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(result)
+
+
+@main.route('/game/<game_id>/hint')
+def game_hint(game_id):
+    game = session_game(game_id)
+    if game is None:
+        return jsonify({'error': 'Unknown game'}), 404
+    with game.lock:
+        return jsonify({'hint': game.hint()})
+
+
+@main.route('/game/<game_id>/reset', methods=['POST'])
+def game_reset(game_id):
+    game = session_game(game_id)
+    if game is None:
+        return jsonify({'error': 'Unknown game'}), 404
+    with game.lock:
+        game.reset()
+        return jsonify(game.as_dict())
+
+
+@main.route('/solve-sudoku', methods=['POST'])
+def solve_sudoku():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not UnifiedSolver.validate_board(data.get('grid')):
+        return jsonify({'error': 'Invalid data'}), 400 #refused here, a malformed grid never takes a pool slot
+    try:
+        result = solver_service.solve(data['grid'])
+    except ServiceBusy:
+        return jsonify({'error': 'The solver is busy, try again shortly'}), 429, {'Retry-After': '1'}
+    status = result['status']
+    code = {'solved': 200, 'unsolvable': 200, 'timeout': 503, 'budget_exceeded': 422}.get(status, 400) #'invalid' and 'error' come from bad grids
+    return jsonify({'status': status, 'solution': result['solution']}), code
@@ -2,6 +2,41 @@ document.addEventListener('DOMContentLoaded', function() {
     const cells = document.querySelectorAll('.txt-input'); // Select all cells in the Sudoku grid
     const keypadKeys = document.querySelectorAll('.keypad-key'); // Select all keypad keys
     const clearButton = document.querySelector('.clear'); // Select the clear button
+    const gridContainer = document.getElementById('grid-container');
+    const gameId = gridContainer ? gridContainer.dataset.gameId : ''; // Server-side game state for live feedback
+
+    // Mark the cells the server reports as conflicting, and drop any old hint highlight
+    function showConflicts(conflicts) {
+        cells.forEach(function(c) {
+            c.classList.remove('conflict', 'hint');
+        });
+        conflicts.forEach(function(index) {
+            document.getElementById(index).classList.add('conflict');
+        });
+    }
+
+    // Send one changed cell to the server, which only re-checks that cell and its row, column and box
+    function sendMove(cell) {
+        if (!gameId || !cell.classList.contains('user-editable')) {
+            return;
+        }
+        const value = parseInt(cell.value.replace(/[^1-9]/g, '')) || 0;
+        fetch('/game/' + gameId + '/move', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({cell: parseInt(cell.id), value: value})
+        })
+        .then(response => response.ok ? response.json() : null)
+        .then(data => {
+            if (data) {
+                showConflicts(data.conflicts);
+                if (data.solved) {
+                    alert("Congratulations! The Sudoku solution is correct.");
+                }
+            }
+        })
+        .catch(error => console.error('Error:', error));
+    }
 
     // Add event listener to each cell in the Sudoku grid
     cells.forEach(function(cell) {
@@ -14,14 +49,56 @@ document.addEventListener('DOMContentLoaded', function() {
             // Add focus to the clicked cell
             cell.classList.add('focused');
         });
+        cell.addEventListener('input', function() {
+            sendMove(cell);
+        });
     });
 
+    // Ask the server for the next step and highlight its cell
+    const hintButton = document.getElementById('hint-sudoku');
+    if (hintButton && gameId) {
+        hintButton.addEventListener('click', function() {
+            fetch('/game/' + gameId + '/hint')
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (!data || !data.hint) {
+                    return;
+                }
+                const hint = data.hint;
+                const cell = document.getElementById(hint.cell);
+                const row = Math.floor(hint.cell / 9) + 1;
+                const col = hint.cell % 9 + 1;
+                cell.classList.add('hint');
+                if (hint.technique === 'mistake') {
+                    alert("Row " + row + ", column " + col + " repeats a digit, clear it.");
+                } else if (hint.technique === 'dead_end') {
+                    alert("The board cannot be finished from here, try clearing row " + row + ", column " + col + ".");
+                } else if (hint.technique === 'solution') {
+                    alert("Row " + row + ", column " + col + " is " + hint.value + ".");
+                } else {
+                    alert("Row " + row + ", column " + col + " can only be " + hint.value + ".");
+                }
+            })
+            .catch(error => console.error('Error:', error));
+        });
+    }
+
     // JavaScript to handle the clear button
     document.querySelector('.clear').addEventListener('click', function() {
         // Clear only user-editable input fields
         document.querySelectorAll('.txt-input.user-editable').forEach(function(input) {
             input.value = ''; // Clear input value
         });
+        if (gameId) {
+            fetch('/game/' + gameId + '/reset', {method: 'POST'})
+            .then(response => response.ok ? response.json() : null)
+            .then(data => {
+                if (data) {
+                    showConflicts(data.conflicts);
+                }
+            })
+            .catch(error => console.error('Error:', error));
+        }
     });
 
 
@@ -37,6 +114,7 @@ document.addEventListener('DOMContentLoaded', function() {
             // If a cell is selected and the button clicked is not "Clear", assign the number to its value
             if (selectedCell && number !== 'Clear') {
                 selectedCell.value = number;
+                sendMove(selectedCell);
             }
         });
     });
@@ -0,0 +1,188 @@
+# Solver benchmark over fixed, seeded corpora, with JSON output and regression checks.
+#
+#   python benchmarks/bench_solvers.py --out run.json                      # measure and save
+#   python benchmarks/bench_solvers.py --compare run.json --threshold 1.5  # fail (exit 1) on regressions
+#
+# Corpora:
+#   csv_bank       every puzzle of app/sudoku_results.csv
+#   hard_known     well-known hard puzzles (mostly 17 clues), all with a unique solution
+#   two_solution   seeded full boards with every 1 and 2 removed, the adversarial case from
+#                  Generating_Unique_Sudokus.ipynb (always more than one solution)
+# For each solver and corpus it reports p50/p95/p99 latency, mean search nodes and backtracks, the deepest
+# search and puzzles per second. Search work comes from the solver's SearchStats.
+#
+# Each corpus is run --repeats times and every board keeps its fastest time, so one slow sample (another process,
+# a GC pause) does not show up as a regression. Node and backtrack counts are the same on every run for a given
+# seed and are always checked. p95/p99 are only checked on corpora of at least MIN_TAIL_PUZZLES boards; on
+# smaller ones they are just the slowest board or two.
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from app.program.Solver_experiment_unified import UnifiedSolver  # noqa: E402
+from app.program.batch_solver import boards_from_csv  # noqa: E402
+from app.program.search_stats import SearchStats  # noqa: E402
+from app.program.sudoku_full_board import SudokuGenerator  # noqa: E402
+
+HARD_KNOWN = (
+    "..............3.85..1.2.......5.7.....4...1...9.......5......73..2.1........4...9",
+    "8..........36......7..9.2...5...7.......457.....1...3...1....68..85...1..9....4..",
+    "4.....8.5.3..........7......2.....6.....8.4......1.......6.3.7.5..2.....1.4......",
+    "52...6.........7.13...........4..8..6......5...........418.........3..2...87.....",
+    "6.....8.3.4.7.................5.4.7.3..2.....1.6.......2.....5.....8.6......1....",
+    "48.3............71.2.......7.5....6....2..8.............1.76...3.....4......5....",
+    "....14....3....2...7..........9...3.6.1.............8.2.....1.4....5.6.....7.8...",
+    "1....7.9..3..2...8..96..5....53..9...1..8...26....4...3......1..4......7..7...3..",
+    "..53.....8......2..7..1.5..4....53...1..7...6..32...8..6.5....9..4....3......97..",
+    ".......1.4.........2...........5.4.7..8...3....1.9....3..4..2...5.1........8.6...",
+)
+
+# (solver, corpus) pairs left out: plain backtracking on 17-clue puzzles can take minutes per puzzle.
+SKIP = {('basic_solve', 'hard_known')}
+
+SOLVERS = ('basic_solve', 'advanced_solve', 'has_single_solution')
+
+MIN_TAIL_PUZZLES = 100 #corpora smaller than this are not gated on p95/p99
+
+
+def _grid(text):
+    return [[0 if c in '.0' else int(c) for c in text[r * 9:r * 9 + 9]] for r in range(9)]
+
+
+def build_corpora(seed, size):
+    rng_state = random.getstate()
+    random.seed(seed)
+    generator = SudokuGenerator(9, 'shuffled')
+    two_solution = []
+    for _ in range(size):
+        generator.generate_full_board()
+        two_solution.append([[0 if cell in (1, 2) else cell for cell in row] for row in generator.board])
+    random.setstate(rng_state)
+    return {
+        'csv_bank': list(boards_from_csv(os.path.join(REPO_ROOT, 'app', 'sudoku_results.csv'))),
+        'hard_known': [_grid(text) for text in HARD_KNOWN],
+        'two_solution': two_solution,
+    }
+
+
+def run_solver(solver_name, board, stats):
+    solver = UnifiedSolver([row[:] for row in board], 'hard', stats=stats)
+    if solver_name == 'has_single_solution':
+        return solver.has_single_solution()
+    return getattr(solver, solver_name)()
+
+
+def percentile(sorted_values, q):
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def measure(solver_name, boards, seed, repeats=5):
+    latencies = [float('inf')] * len(boards)
+    stats = SearchStats()
+    total = float('inf')
+    for _ in range(max(1, repeats)):
+        random.seed(seed) #the 'sets' tie-break and any other randomness replays identically on every repeat
+        nodes, backtracks = [], []
+        max_depth = 0
+        start = time.perf_counter()
+        for k, board in enumerate(boards):
+            stats.reset()
+            run_solver(solver_name, board, stats)
+            latencies[k] = min(latencies[k], stats.seconds)
+            nodes.append(stats.nodes)
+            backtracks.append(stats.backtracks)
+            max_depth = max(max_depth, stats.max_depth)
+        total = min(total, time.perf_counter() - start)
+    latencies.sort()
+    return {
+        'puzzles': len(boards),
+        'repeats': max(1, repeats),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        'mean_nodes': round(statistics.mean(nodes), 2),
+        'mean_backtracks': round(statistics.mean(backtracks), 2),
+        'max_depth': max_depth,
+        'puzzles_per_sec': round(len(boards) / total, 1) if total else None,
+    }
+
+
+def run_benchmarks(seed=2024, size=200, solvers=SOLVERS, repeats=5):
+    corpora = build_corpora(seed, size)
+    results = {}
+    for solver_name in solvers:
+        for corpus, boards in corpora.items():
+            if (solver_name, corpus) not in SKIP:
+                results.setdefault(solver_name, {})[corpus] = measure(solver_name, boards, seed, repeats)
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT,
+                             capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {
+        'meta': {'seed': seed, 'size': size, 'repeats': max(1, repeats), 'git': rev,
+                 'python': platform.python_version(), 'machine': platform.machine(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': results,
+    }
+
+
+def find_regressions(current, baseline, threshold):
+    # Latency and node counts may grow by at most threshold times, throughput may shrink by at most as much.
+    # Node counts are deterministic for a given seed, so they also catch regressions on a noisy machine.
+    # Tail latencies of small corpora are single samples and are reported but not checked.
+    problems = []
+    for solver_name, corpora in baseline['results'].items():
+        for corpus, old in corpora.items():
+            new = current['results'].get(solver_name, {}).get(corpus)
+            if new is None:
+                continue
+            keys = ['mean_nodes', 'mean_backtracks', 'p50_ms']
+            if min(old['puzzles'], new['puzzles']) >= MIN_TAIL_PUZZLES:
+                keys += ['p95_ms', 'p99_ms']
+            for key in keys:
+                if old.get(key) and new.get(key, 0) > old[key] * threshold:
+                    problems.append(f"{solver_name}/{corpus}: {key} {old[key]} -> {new[key]}")
+            # A run too short for the timer to see has no throughput, which is not evidence the solver kept up.
+            if old['puzzles_per_sec'] and (new['puzzles_per_sec'] is None
+                                           or new['puzzles_per_sec'] < old['puzzles_per_sec'] / threshold):
+                problems.append(f"{solver_name}/{corpus}: puzzles_per_sec {old['puzzles_per_sec']} -> {new['puzzles_per_sec']}")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Solver benchmark over fixed, seeded corpora')
+    parser.add_argument('--seed', type=int, default=2024)
+    parser.add_argument('--size', type=int, default=200, help='boards in the generated two_solution corpus')
+    parser.add_argument('--solvers', nargs='+', default=list(SOLVERS), choices=SOLVERS)
+    parser.add_argument('--repeats', type=int, default=5, help='runs per corpus, every board keeps its fastest time')
+    parser.add_argument('--out', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='baseline JSON from an earlier run, exit 1 on regressions')
+    parser.add_argument('--threshold', type=float, default=1.5, help='allowed slowdown factor against the baseline')
+    args = parser.parse_args()
+
+    report = run_benchmarks(args.seed, args.size, args.solvers, args.repeats)
+    print(json.dumps(report, indent=2))
+    if args.out:
+        with open(args.out, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.compare:
+        with open(args.compare) as file:
+            problems = find_regressions(report, json.load(file), args.threshold)
+        for problem in problems:
+            print(f"REGRESSION {problem}", file=sys.stderr)
+        sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()
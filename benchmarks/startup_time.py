@@ -0,0 +1,69 @@
+# Cold-start benchmark for the web app: time from a fresh interpreter to a ready app, and to the first puzzle page.
+# Each sample is a new process, which is what run.py and every gunicorn worker pay on boot.
+#
+#   python benchmarks/startup_time.py                      # this tree, lazy and prewarmed
+#   python benchmarks/startup_time.py --baseline <git rev>  # also time the app as it was at <rev>
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs inside the child process. Prints seconds to create_app() and to the first /easy response.
+PROBE = """
+import inspect, json, time
+start = time.perf_counter()
+from app import create_app
+app = create_app(prewarm=True) if {prewarm} and 'prewarm' in inspect.signature(create_app).parameters else create_app()
+ready = time.perf_counter()
+app.test_client().get('/easy')
+first = time.perf_counter()
+print(json.dumps({{'create_app': ready - start, 'first_request': first - start}}))
+"""
+
+
+def sample(root, prewarm, runs):
+    results = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', PROBE.format(prewarm=prewarm)], cwd=root,
+                             capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    return {key: statistics.median(r[key] for r in results) for key in results[0]}
+
+
+def export_revision(rev, target): #copies app/ and run.py as they were at rev, without touching the work tree
+    archive = subprocess.run(['git', 'archive', '--format=tar', rev, 'app', 'run.py'], cwd=REPO_ROOT,
+                             capture_output=True, check=True).stdout
+    path = os.path.join(target, 'rev.tar')
+    with open(path, 'wb') as file:
+        file.write(archive)
+    with tarfile.open(path) as tar:
+        tar.extractall(target)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Cold-start benchmark for the web app')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--baseline', help='git revision to compare against, e.g. the commit before the lazy loading')
+    args = parser.parse_args()
+
+    rows = []
+    if args.baseline:
+        with tempfile.TemporaryDirectory() as tmp:
+            export_revision(args.baseline, tmp)
+            rows.append((f'baseline {args.baseline}', sample(tmp, False, args.runs)))
+    rows.append(('lazy (default)', sample(REPO_ROOT, False, args.runs)))
+    rows.append(('prewarm=True', sample(REPO_ROOT, True, args.runs)))
+
+    print(f"{'variant':<24}{'create_app (ms)':>18}{'first /easy (ms)':>20}")
+    for name, timing in rows:
+        print(f"{name:<24}{timing['create_app'] * 1000:>18.1f}{timing['first_request'] * 1000:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()